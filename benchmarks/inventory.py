@@ -0,0 +1,93 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+#
+# Compares the memory used by a listing of synthetic objects stored
+# as dicts (the form returned by the ListObjectsV2 paginator) with an
+# Inventory, and measures the time of a typical inventory query.
+#
+# Usage: python benchmarks/inventory.py [--objects N]
+#
+# Requires numpy.
+#
+
+import argparse
+import datetime
+import time
+import tracemalloc
+
+from cos_utils.inventory import Inventory
+from cos_utils.records import ObjectRecord
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+
+def listing(count):
+    for number in range(count):
+        yield {'Key': 'data/run{:04d}/part-{:08d}.parquet'
+                      .format(number % 1000, number),
+               'Size': number % 65536,
+               'ETag': '"0cc175b9c0f1b6a831c399e269772661"',
+               'LastModified': NOW - datetime.timedelta(hours=number % 2000),
+               'StorageClass': 'STANDARD'}
+
+
+def measure(build):
+    # memory that the result of build occupies
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def build_inventory(count):
+    return Inventory.from_records(ObjectRecord.from_listing(entry)
+                                  for entry in listing(count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inventory benchmark')
+    parser.add_argument('--objects',
+                        type=int,
+                        default=1000000,
+                        help='Number of synthetic objects')
+    args = parser.parse_args()
+
+    objects, dict_size = measure(lambda: list(listing(args.objects)))
+    del objects
+    inventory, inventory_size = \
+        measure(lambda: build_inventory(args.objects))
+
+    print('dicts     {:>12,} bytes'.format(dict_size))
+    print('inventory {:>12,} bytes ({:.1%})'
+          .format(inventory_size, inventory_size / dict_size))
+
+    start = time.perf_counter()
+    inventory = build_inventory(args.objects)
+    print('built inventory in {:.3f}s (including synthetic listing)'
+          .format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    old = inventory.modified_before(datetime.timedelta(days=30))
+    groups = inventory.group_by_prefix(depth=2, mask=old)
+    print('bytes per prefix older than 30 days: {} prefixes in {:.3f}s'
+          .format(len(groups), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
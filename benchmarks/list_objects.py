@@ -0,0 +1,84 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+# Compares the listing throughput of the resource-based object
+# collection (which creates an ObjectSummary per key) with the
+# ListObjectsV2 paginator that COSWrapper uses, returning keys only
+# or ObjectRecords.
+#
+# Usage: python benchmarks/list_objects.py [--prefix PREFIX]
+#
+# Environment variables aws_access_key_id, aws_secret_access_key and
+# x_region_bucket_name must be defined.
+#
+
+import argparse
+import os
+import time
+
+from cos_utils.cos import COSWrapper
+
+
+def list_resource(cw, bucket, prefix):
+    # listing approach used prior to the introduction of iter_object_pages
+    return [object.key
+            for object in cw.cos.Bucket(bucket).objects.filter(Prefix=prefix)]
+
+
+def list_paginator(cw, bucket, prefix):
+    return cw.get_object_list(bucket, prefix)
+
+
+def list_records(cw, bucket, prefix):
+    return list(cw.iter_object_records(bucket, prefix))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Object listing benchmark')
+    parser.add_argument('--prefix',
+                        default='',
+                        help='Key name prefix')
+    parser.add_argument('--endpoint',
+                        default=COSWrapper.US_GEO_URL,
+                        help='Cloud Object Storage endpoint URL')
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=3,
+                        help='Number of runs per listing approach')
+    args = parser.parse_args()
+
+    bucket = os.environ['x_region_bucket_name']
+    cw = COSWrapper(os.environ['aws_access_key_id'],
+                    os.environ['aws_secret_access_key'],
+                    endpoint_url=args.endpoint,
+                    connectivity_test_bucket=bucket)
+
+    for name, func in [('resource', list_resource),
+                       ('paginator', list_paginator),
+                       ('records', list_records)]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            count = len(func(cw, bucket, args.prefix))
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print('{:10} {:>10} keys  best {:8.3f}s  {:>12.0f} keys/s'
+              .format(name, count, best, count / best if best else 0))
+
+
+if __name__ == '__main__':
+    main()
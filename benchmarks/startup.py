@@ -0,0 +1,128 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+# Measures the cold-start cost of each console script: the cumulative
+# import time of its module (as reported by python -X importtime) and
+# the wall-clock time of an invocation with --help.
+#
+# Usage: python benchmarks/startup.py [--save FILE] [--baseline FILE]
+#
+# Use --save to record the results of a release and --baseline to
+# compare against them; the script exits with a non-zero return code
+# if the import time of an entry point grew by more than --tolerance
+# percent. No Cloud Object Storage credentials are required.
+#
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = ['abort_uploads',
+                'download_files',
+                'list_buckets',
+                'list_files',
+                'remove_files',
+                'upload_files']
+
+
+def import_time(module):
+    # cumulative import time in microseconds
+    result = subprocess.run([sys.executable,
+                             '-X',
+                             'importtime',
+                             '-c',
+                             'import {}'.format(module)],
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE,
+                            universal_newlines=True,
+                            check=True)
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise RuntimeError('No import time reported for {}'.format(module))
+
+
+def help_time(module):
+    # wall-clock time in microseconds
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', module, '--help'],
+                   stdout=subprocess.DEVNULL,
+                   check=True)
+    return int((time.perf_counter() - start) * 1000000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI startup benchmark')
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=10,
+                        help='Number of runs per entry point')
+    parser.add_argument('--save',
+                        help='Store the results in the specified file')
+    parser.add_argument('--baseline',
+                        help='Compare the results with the specified file')
+    parser.add_argument('--tolerance',
+                        type=float,
+                        default=20,
+                        help='Permitted import time growth in percent')
+    args = parser.parse_args()
+
+    results = {}
+    for entry_point in ENTRY_POINTS:
+        module = 'cos_utils.{}'.format(entry_point)
+        # use the median to reduce the impact of outliers
+        results[entry_point] = {
+            'import_us': statistics.median(import_time(module)
+                                           for _ in range(args.repeat)),
+            'help_us': statistics.median(help_time(module)
+                                         for _ in range(args.repeat))
+        }
+        print('{:15} import {:8.1f}ms  --help {:8.1f}ms'
+              .format(entry_point,
+                      results[entry_point]['import_us'] / 1000,
+                      results[entry_point]['help_us'] / 1000))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = 0
+        for entry_point, result in results.items():
+            if entry_point not in baseline:
+                continue
+            limit = baseline[entry_point]['import_us'] * \
+                (1 + args.tolerance / 100)
+            if result['import_us'] > limit:
+                regressions = regressions + 1
+                print('{}: import time {:.1f}ms exceeds the baseline '
+                      '({:.1f}ms)'
+                      .format(entry_point,
+                              result['import_us'] / 1000,
+                              baseline[entry_point]['import_us'] / 1000))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
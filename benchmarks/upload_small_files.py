@@ -0,0 +1,118 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+# Compares the upload throughput for small files of the transfer
+# manager (upload_fileobj) with the single request (put_object) path
+# that COSWrapper.upload_object uses for files below the multipart
+# threshold. The files are generated in a temporary directory.
+#
+# Usage: python benchmarks/upload_small_files.py [--files 100000]
+#
+# Environment variables aws_access_key_id, aws_secret_access_key and
+# x_region_bucket_name must be defined. Uploaded objects are stored
+# under the 'benchmark/' key name prefix and removed afterwards.
+#
+
+import argparse
+import ibm_boto3
+import os
+import tempfile
+import time
+
+from cos_utils.cos import COSWrapper
+from cos_utils.parallel import run_tasks
+
+
+def upload_transfer_manager(cw, bucket, file, key):
+    # upload approach used for all files prior to the
+    # introduction of the small file fast path
+    with open(file, 'rb') as data:
+        config = ibm_boto3.s3.transfer.TransferConfig(
+                    multipart_threshold=cw.MULTIPART_THRESHOLD,
+                    multipart_chunksize=cw.MULTIPART_CHUNKSIZE)
+        # use the shared client, like upload_object; the per-thread
+        # resource would create a client in every worker thread
+        cw.client.upload_fileobj(Fileobj=data,
+                                 Bucket=bucket,
+                                 Key=key,
+                                 Config=config)
+    return True
+
+
+def upload_put_object(cw, bucket, file, key):
+    cw.upload_object(file, bucket, key)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Small file upload '
+                                                 'benchmark')
+    parser.add_argument('--files',
+                        type=int,
+                        default=100000,
+                        help='Number of files')
+    parser.add_argument('--size',
+                        type=int,
+                        default=200,
+                        help='File size in bytes')
+    parser.add_argument('--jobs',
+                        type=int,
+                        default=16,
+                        help='Number of concurrent uploads')
+    parser.add_argument('--endpoint',
+                        default=COSWrapper.US_GEO_URL,
+                        help='Cloud Object Storage endpoint URL')
+    args = parser.parse_args()
+
+    bucket = os.environ['x_region_bucket_name']
+    cw = COSWrapper(os.environ['aws_access_key_id'],
+                    os.environ['aws_secret_access_key'],
+                    endpoint_url=args.endpoint,
+                    connectivity_test_bucket=bucket)
+
+    with tempfile.TemporaryDirectory() as source_dir:
+        # generate a tree of small files, 1000 files per directory
+        files = []
+        for index in range(args.files):
+            directory = os.path.join(source_dir, str(index // 1000))
+            os.makedirs(directory, exist_ok=True)
+            file = os.path.join(directory, '{}.json'.format(index))
+            with open(file, 'wb') as data:
+                data.write(os.urandom(args.size))
+            files.append(file)
+
+        for name, func in [('transfer manager', upload_transfer_manager),
+                           ('put_object', upload_put_object)]:
+            start = time.perf_counter()
+            count, failures = run_tasks(
+                lambda file: func(cw,
+                                  bucket,
+                                  file,
+                                  'benchmark/{}'.format(
+                                      os.path.relpath(file, source_dir))),
+                files,
+                args.jobs)
+            elapsed = time.perf_counter() - start
+            print('{:16} {:>8} files  {:8.3f}s  {:>10.0f} files/s  '
+                  '{} failed'
+                  .format(name, count, elapsed, count / elapsed,
+                          len(failures)))
+            cw.clear_bucket(bucket, 'benchmark/')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+# This utility aborts incomplete multipart uploads in an existing
+# bucket in a Cloud Object Storage instance on IBM Cloud.
+#
+
+
+import argparse
+import datetime
+import os
+import sys
+
+from .daemon import call
+
+
+class AbortError(Exception):
+    pass
+
+
+def do_abort(bucket,
+             access_key_id,
+             secret_access_key,
+             prefix=None,
+             older_than=None,
+             verbose=False,
+             jobs=4,
+             cos_wrapper=None):
+    """
+    Abort incomplete multipart uploads in the specified bucket,
+    discarding the parts that were uploaded.
+
+    :param bucket: Bucket name. (Must exist)
+    :type bucket: str
+    :param access_key_id: HMAC access key id
+    :type access_key_id: str
+    :param secret_access_key: HMAC secret access key
+    :type secret_access_key: str
+    :param prefix: only abort uploads for keys that start with
+    prefix, defaults to None
+    :type prefix: str, optional
+    :param older_than: only abort uploads that were initiated at
+    least this long ago, defaults to None
+    :type older_than: datetime.timedelta, optional
+    :param verbose: print diagnostic information, defaults to False
+    :type verbose: bool, optional
+    :param jobs: maximum number of concurrent abort requests,
+    defaults to 4
+    :type jobs: int, optional
+    :param cos_wrapper: wrapper to be used instead of a (cached)
+    wrapper for the specified credentials, defaults to None
+    :type cos_wrapper: COSWrapper, optional
+    :raises ValueError: A required parameter value is missing.
+    :raises AbortError: The operation failed due to the specified reason.
+    :return: Number of aborted uploads
+    :rtype: int
+    """
+
+    # the SDK is imported on demand to keep the startup time low
+    from .cos import COSWrapperError, get_cos_wrapper
+
+    if not bucket:
+        raise ValueError('Parameter "bucket" is required')
+
+    if cos_wrapper is None:
+        if not access_key_id:
+            raise ValueError('Parameter "access_key_id" is required')
+
+        if not secret_access_key:
+            raise ValueError('Parameter "secret_access_key" is required')
+
+    try:
+        # reuse the wrapper for these credentials, if one exists;
+        # its connection pool must accommodate all concurrent requests
+        cw = cos_wrapper or \
+            get_cos_wrapper(access_key_id,
+                            secret_access_key,
+                            max_pool_connections=jobs)
+        # connectivity is only verified once per wrapper and bucket
+        cw.verify_connectivity(bucket)
+    except COSWrapperError as cwe:
+        raise AbortError('Cannot access Cloud Object Storage: {}'
+                         .format(cwe))
+
+    try:
+        if verbose:
+            print('Aborting incomplete uploads in bucket "{}" ...'
+                  .format(bucket))
+        return cw.abort_multipart_uploads(bucket,
+                                          prefix,
+                                          older_than=older_than,
+                                          jobs=jobs)
+    except Exception as ex:
+        # catch and mask exception
+        raise AbortError('Aborting uploads in bucket "{}" failed: {}'
+                         .format(bucket, ex))
+
+
+def main():
+
+    epilog_msg = 'Environment variables AWS_ACCESS_KEY_ID and ' \
+                 'AWS_SECRET_ACCESS_KEY must be defined to run the utility.'
+
+    parser = argparse.ArgumentParser(description='Abort incomplete '
+                                                 'multipart uploads in a '
+                                                 'Cloud Object '
+                                                 'Storage bucket.',
+                                     epilog=epilog_msg)
+    parser.add_argument('bucket',
+                        help='Bucket name')
+    parser.add_argument('-p',
+                        '--prefix',
+                        help='Key name prefix')
+    parser.add_argument('-o',
+                        '--older-than',
+                        help='Only abort uploads that were started at '
+                             'least the specified number of hours ago',
+                        type=float)
+    parser.add_argument('-j',
+                        '--jobs',
+                        help='Maximum number of concurrent abort requests. '
+                             'Defaults to 4.',
+                        type=int,
+                        default=4)
+
+    # parse command line parameters
+    args = parser.parse_args()
+
+    # verify that the required environment variables are set
+    # - AWS_ACCESS_KEY_ID
+    # - AWS_SECRET_ACCESS_KEY
+    if (os.environ.get('AWS_ACCESS_KEY_ID') is None) or \
+       (os.environ.get('AWS_SECRET_ACCESS_KEY') is None):
+        print('Error. Environment variables AWS_ACCESS_KEY_ID'
+              ' and AWS_SECRET_ACCESS_KEY must be set.')
+        sys.exit(1)
+
+    older_than = None
+    if args.older_than is not None:
+        older_than = datetime.timedelta(hours=args.older_than)
+
+    try:
+        # abort uploads
+        upload_count = call(do_abort,
+                            args.bucket,
+                            os.environ['AWS_ACCESS_KEY_ID'],
+                            os.environ['AWS_SECRET_ACCESS_KEY'],
+                            args.prefix,
+                            older_than,
+                            verbose=True,
+                            jobs=args.jobs)
+
+        print('Aborted {} incomplete upload(s) in bucket "{}".'
+              .format(upload_count, args.bucket))
+    except Exception as ex:
+        print('Error. {}'.format(ex))
+        # exit with non-zero return code
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,11 +14,30 @@
 # limitations under the License.
 #
 
+import datetime
+import hashlib
 import ibm_boto3
+import ibm_boto3.s3.transfer
+import json
 import numbers
 import os
+import threading
 
-from ibm_botocore.client import ClientError
+from ibm_botocore.client import ClientError, Config
+
+from .parallel import run_tasks
+from .records import ObjectRecord
+
+try:
+    import contextvars
+except ImportError:
+    # Python 3.6
+    contextvars = None
+
+
+# wrappers returned by get_cos_wrapper, keyed by credentials and endpoint
+_wrappers = {}
+_wrappers_lock = threading.Lock()
 
 
 class COSWrapperError(Exception):
@@ -29,6 +48,102 @@ class BucketNotFoundError(Exception):
     pass
 
 
+def compute_etag(file,
+                 multipart_threshold,
+                 multipart_chunksize):
+    """
+    Compute the ETag that Cloud Object Storage assigns to an object
+    if file is uploaded using the specified multipart settings. For
+    single part uploads the ETag is the MD5 digest of the content.
+    For multipart uploads it is the MD5 digest of the concatenated
+    part digests, followed by '-' and the number of parts.
+
+    :param file: file name (including path)
+    :type file: str
+
+    :param multipart_threshold: minimum file size for multipart uploads
+    :type multipart_threshold: int
+
+    :param multipart_chunksize: part size for multipart uploads
+    :type multipart_chunksize: int
+
+    :returns: ETag (without quotes)
+    :rtype: str
+
+    :raises FileNotFoundError: file was not found
+    """
+
+    if os.path.getsize(file) < multipart_threshold:
+        digest = hashlib.md5()
+        with open(file, 'rb') as data:
+            for chunk in iter(lambda: data.read(1024*1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    part_digests = []
+    with open(file, 'rb') as data:
+        for part in iter(lambda: data.read(multipart_chunksize), b''):
+            part_digests.append(hashlib.md5(part).digest())
+    return '{}-{}'.format(hashlib.md5(b''.join(part_digests)).hexdigest(),
+                          len(part_digests))
+
+
+def get_cos_wrapper(aws_access_key_id,
+                    aws_secret_access_key,
+                    endpoint_url=None,
+                    max_pool_connections=None):
+    """
+    Return a COSWrapper for the specified credentials and endpoint.
+    The wrapper is created on the first call and reused by subsequent
+    calls with the same parameters. No connectivity test is performed
+    when the wrapper is created; call verify_connectivity if needed.
+    If the cached wrapper's connection pool is smaller than requested
+    it is replaced by a wrapper with a larger pool.
+
+    :param aws_access_key_id: Access Key Id
+    :type aws_access_key_id: str
+
+    :param aws_secret_access_key: Secret access key
+    :type aws_secret_access_key: str
+
+    :param endpoint_url: COS service endpoint URL; \
+        default: https://s3.us.cloud-object-storage.appdomain.cloud
+    :type endpoint_url: str
+
+    :param max_pool_connections: minimum number of connections the
+    wrapper keeps open; defaults to None (10)
+    :type max_pool_connections: int, optional
+
+    :returns: shared wrapper instance
+    :rtype: COSWrapper
+
+    :raises COSWrapperError: an error occurred
+    """
+
+    endpoint_url = endpoint_url or COSWrapper.US_GEO_URL
+    # don't keep the secret in memory more often than necessary
+    key = (aws_access_key_id,
+           hashlib.sha256(aws_secret_access_key.encode('utf-8')).hexdigest(),
+           endpoint_url)
+
+    max_pool_connections = max(max_pool_connections or 0,
+                               COSWrapper.MAX_POOL_CONNECTIONS)
+
+    with _wrappers_lock:
+        cw = _wrappers.get(key)
+        if cw is None or cw.max_pool_connections < max_pool_connections:
+            cw = COSWrapper(aws_access_key_id,
+                            aws_secret_access_key,
+                            endpoint_url=endpoint_url,
+                            connectivity_test=False,
+                            max_pool_connections=max_pool_connections)
+            if key in _wrappers:
+                # the credentials were already verified
+                cw.verified_buckets.update(_wrappers[key].verified_buckets)
+            _wrappers[key] = cw
+        return cw
+
+
 class COSWrapper:
     """
     Wrapper class for common Cloud Object Storage tasks
@@ -36,12 +151,31 @@ class COSWrapper:
 
     US_GEO_URL = 'https://s3.us.cloud-object-storage.appdomain.cloud'
 
+    # take advantage of multi-part uploads for
+    # files larger than 15 MB
+    MULTIPART_THRESHOLD = 1024*1024*15
+    # minimum and maximum part size
+    MULTIPART_CHUNKSIZE = 1024*1024*5
+    MULTIPART_MAX_CHUNKSIZE = 1024*1024*1024*5
+    # an upload can consist of up to 10000 parts; part sizes are
+    # chosen such that large files are split into about 1000 parts
+    MULTIPART_MAX_PARTS = 10000
+    MULTIPART_TARGET_PARTS = 1000
+    # maximum number of parts that are uploaded concurrently
+    MULTIPART_CONCURRENCY = 10
+    # size of byte ranges for concurrent downloads of large objects
+    RANGE_SIZE = 1024*1024*64
+    # default number of connections that are kept open
+    MAX_POOL_CONNECTIONS = 10
+
     def __init__(
                 self,
                 aws_access_key_id,
                 aws_secret_access_key,
                 endpoint_url=US_GEO_URL,
-                connectivity_test_bucket=None):
+                connectivity_test_bucket=None,
+                connectivity_test=True,
+                max_pool_connections=MAX_POOL_CONNECTIONS):
         """
             :param aws_access_key_id: Access Key Id
             :type aws_access_key_id: str
@@ -58,6 +192,16 @@ class COSWrapper:
             performed to verify that the credentials are valid;defaults to None
             :type connectivity_test_bucket: str, optional
 
+            :param connectivity_test: if set to False, the connectivity
+            test is skipped and invalid credentials are only detected
+            when the first request is sent; defaults to True
+            :type connectivity_test: bool, optional
+
+            :param max_pool_connections: maximum number of connections
+            that are kept open; should be at least the number of
+            concurrent requests; defaults to 10
+            :type max_pool_connections: int, optional
+
             :raises COSWrapperError: an error occurred
         """
 
@@ -66,21 +210,132 @@ class COSWrapper:
         assert aws_secret_access_key is not None,\
             'Parameter aws_secret_access_key cannot be None'
 
+        # buckets for which the connectivity test succeeded
+        self.verified_buckets = set()
+
+        self.max_pool_connections = max_pool_connections
+        self._session_args = {
+            'aws_access_key_id': aws_access_key_id,
+            'aws_secret_access_key': aws_secret_access_key
+        }
+        self._resource_args = {
+            'endpoint_url': endpoint_url,
+            'config': Config(max_pool_connections=max_pool_connections)
+        }
+        # resources are not thread-safe; each thread gets its own
+        self._local = threading.local()
+
+        try:
+            # clients are thread-safe; all threads share the client's
+            # connection pool
+            self.client = ibm_boto3.session\
+                                   .Session(**self._session_args)\
+                                   .client('s3', **self._resource_args)
+        except Exception as ex:
+            raise COSWrapperError(ex)
+
+        if connectivity_test:
+            self.verify_connectivity(connectivity_test_bucket)
+
+    @property
+    def cos(self):
+        """
+            Cloud Object Storage resource for the calling thread
+
+            :rtype: ibm_boto3.resources.base.ServiceResource
+        """
+        resource = getattr(self._local, 'resource', None)
+        if resource is None:
+            # sessions are not thread-safe either
+            resource = ibm_boto3.session\
+                                .Session(**self._session_args)\
+                                .resource('s3', **self._resource_args)
+            self._local.resource = resource
+        return resource
+
+    def warm_up(self,
+                bucket_name,
+                connections=None):
+        """
+            Open connections to the service and keep them in the pool,
+            so that a subsequent transfer doesn't wait for connections
+            to be established. Concurrent HEAD requests are sent to
+            the specified bucket.
+
+            :param bucket_name: bucket name
+            :type bucket_name: str
+
+            :param connections: number of connections to be opened;
+            defaults to None (max_pool_connections)
+            :type connections: int, optional
+
+            :returns: number of open connections
+            :rtype: int
+
+            :raises COSWrapperError: an error occurred
+        """
+
+        assert bucket_name is not None, \
+            'Parameter bucket_name cannot be None'
+
+        connections = min(connections or self.max_pool_connections,
+                          self.max_pool_connections)
+        # send the requests at the same time; otherwise
+        # they might be sent using the same connection
+        barrier = threading.Barrier(connections)
+
+        def head(_):
+            try:
+                barrier.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+            self.client.head_bucket(Bucket=bucket_name)
+            return True
+
+        count, failures = run_tasks(head,
+                                    range(connections),
+                                    jobs=connections,
+                                    queue_size=connections)
+        if failures:
+            raise COSWrapperError(failures[0][1])
+        return count
+
+    def verify_connectivity(self,
+                            bucket_name=None):
+        """
+            Verify that the credentials are valid by accessing the
+            specified bucket or, if no bucket is specified, by listing
+            buckets. A successful test is remembered; subsequent calls
+            for the same bucket don't send a request.
+
+            :param bucket_name: bucket name; defaults to None
+            :type bucket_name: str, optional
+
+            :raises COSWrapperError: an error occurred
+        """
+
+        if bucket_name in self.verified_buckets:
+            return
+
         try:
-            self.cos = ibm_boto3\
-                        .resource('s3',
-                                  aws_access_key_id=aws_access_key_id,
-                                  aws_secret_access_key=aws_secret_access_key,
-                                  endpoint_url=endpoint_url)
-            if not connectivity_test_bucket:
+            if not bucket_name:
                 # verify connectitivy by sending a dummy request
                 self.get_bucket_list(1)
             else:
-                self.cos.Bucket(connectivity_test_bucket).load()
-
+                # same request as Bucket.load(), but sent using the
+                # shared client; short-lived threads (e.g. those of
+                # the daemon) don't have to create a resource
+                try:
+                    self.client.list_buckets()
+                except ClientError as ce:
+                    if ce.response.get('Error', {}).get('Code') != \
+                       'AccessDenied':
+                        raise
         except Exception as ex:
             raise COSWrapperError(ex)
 
+        self.verified_buckets.add(bucket_name)
+
     def get_bucket_list(self,
                         limit=None):
         """
@@ -100,13 +355,13 @@ class COSWrapper:
                 'Parameter "limit" must be a numeric'
 
         try:
+            # use the shared client; no resource is created
+            buckets = self.client.list_buckets().get('Buckets', [])
             if limit is not None and limit > 0:
-                buckets = list(self.cos.buckets.limit(limit))
-            else:
-                buckets = list(self.cos.buckets.all())
+                buckets = buckets[:limit]
             bucket_list = []
             for bucket in buckets:
-                bucket_list.append(bucket.name)
+                bucket_list.append(bucket['Name'])
             return bucket_list
         except Exception as ex:
             raise COSWrapperError(ex)
@@ -176,7 +431,8 @@ class COSWrapper:
 
     def clear_bucket(self,
                      bucket_name,
-                     key_name_prefix=''):
+                     key_name_prefix='',
+                     jobs=4):
         """
             Remove all objects from the bucket with the specified name.
 
@@ -186,20 +442,26 @@ class COSWrapper:
             :param key_name_prefix: key name prefix
             :type key_name_prefix: str
 
+            :param jobs: maximum number of concurrent delete requests;
+            defaults to 4
+            :type jobs: int
+
+            :returns: number of deleted objects
+            :rtype: int
+
             :raises BucketNotFoundError: bucket_name does not exist
             :raises ValueError: bucket_name is invalid
             :raises COSWrapperError: an error occurred
         """
 
         try:
-            # fetch object list for this bucket
-            object_list = self.get_object_list(bucket_name,
-                                               key_name_prefix)
-            # perform bulk delete
-            self.delete_objects(bucket_name,
-                                object_list)
-            # return number of deleted objects
-            return len(object_list)
+            # perform bulk delete while the object list
+            # for this bucket is fetched; return number
+            # of deleted objects
+            return self.delete_objects(bucket_name,
+                                       self.iter_objects(bucket_name,
+                                                         key_name_prefix),
+                                       jobs=jobs)
         except BucketNotFoundError:
             raise
         except ValueError:
@@ -280,17 +542,118 @@ class COSWrapper:
             :raises COSWrapperError: an error occurred
         """
 
+        return list(self.iter_objects(bucket_name,
+                                      key_name_prefix))
+
+    def iter_objects(self,
+                     bucket_name,
+                     key_name_prefix='',
+                     page_size=1000):
+        """
+            Iterate over the keys of objects in bucket_name having the
+            specified key_name_prefix. Keys are yielded as soon as the
+            listing page that contains them was received.
+
+            :param bucket_name: bucket_name identifier
+            :type bucket_name: str
+
+            :param key_name_prefix: key name prefix to use
+            :type key_name_prefix: str
+
+            :param page_size: maximum number of keys to fetch per
+            request; defaults to 1000
+            :type page_size: int
+
+            :returns: object keys
+            :rtype: generator
+
+            :raises BucketNotFoundError: bucket_name does not exist
+            :raises ValueError: bucket_name is invalid
+            :raises COSWrapperError: an error occurred
+        """
+
+        for page in self.iter_object_pages(bucket_name,
+                                           key_name_prefix,
+                                           page_size):
+            for object in page:
+                yield object['Key']
+
+    def iter_object_records(self,
+                            bucket_name,
+                            key_name_prefix='',
+                            page_size=1000):
+        """
+            Iterate over the objects in bucket_name having the specified
+            key_name_prefix. Unlike iter_objects, the size, ETag and
+            modification time that the listing returns are retained.
+            Records are yielded as soon as the listing page that
+            contains them was received.
+
+            :param bucket_name: bucket_name identifier
+            :type bucket_name: str
+
+            :param key_name_prefix: key name prefix to use
+            :type key_name_prefix: str
+
+            :param page_size: maximum number of objects to fetch per
+            request; defaults to 1000
+            :type page_size: int
+
+            :returns: object records
+            :rtype: generator(ObjectRecord)
+
+            :raises BucketNotFoundError: bucket_name does not exist
+            :raises ValueError: bucket_name is invalid
+            :raises COSWrapperError: an error occurred
+        """
+
+        for page in self.iter_object_pages(bucket_name,
+                                           key_name_prefix,
+                                           page_size):
+            for object in page:
+                yield ObjectRecord.from_listing(object)
+
+    def iter_object_pages(self,
+                          bucket_name,
+                          key_name_prefix='',
+                          page_size=1000):
+        """
+            Iterate over the listing pages for objects in bucket_name
+            having the specified key_name_prefix. Each page is the raw
+            'Contents' list of a ListObjectsV2 response, i.e. a list of
+            dicts with Key, Size, ETag, LastModified and StorageClass
+            entries. No resource is created for the listed objects.
+
+            :param bucket_name: bucket_name identifier
+            :type bucket_name: str
+
+            :param key_name_prefix: key name prefix to use
+            :type key_name_prefix: str
+
+            :param page_size: maximum number of objects to fetch per
+            request; defaults to 1000
+            :type page_size: int
+
+            :returns: lists of object dicts
+            :rtype: generator
+
+            :raises BucketNotFoundError: bucket_name does not exist
+            :raises ValueError: bucket_name is invalid
+            :raises COSWrapperError: an error occurred
+        """
+
         if key_name_prefix is None:
             key_name_prefix = ''
 
         try:
-            object_list = []
-            for object in self.cos.Bucket(bucket_name) \
-                              .objects.filter(Prefix=key_name_prefix):
-                # contains two properties: bucket_name and key
-                object_list.append(object.key)
-
-            return object_list
+            paginator = self.client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=bucket_name,
+                                           Prefix=key_name_prefix,
+                                           PaginationConfig={
+                                               'PageSize': page_size
+                                           }):
+                # empty result sets don't include a 'Contents' entry
+                yield page.get('Contents', [])
 
         except ClientError as ce:
             # print('Exception type: {}'.format(type(ce)))
@@ -311,10 +674,73 @@ class COSWrapper:
             # print('Exception: {}'.format(ex))
             raise COSWrapperError(ex)
 
+    def get_part_size(self,
+                      file_size,
+                      part_size=None):
+        """
+        Determine the part size for a multipart upload of a file
+        with the specified size. Unless part_size is specified, the
+        part size grows with the file size, limiting the number of
+        parts (and therefore requests) for large files.
+
+        :param file_size: file size in bytes
+        :type file_size: int
+
+        :param part_size: requested part size in bytes; it is
+        increased if the file would otherwise consist of too many parts
+        :type part_size: int
+
+        :returns: part size in bytes
+        :rtype: int
+        """
+
+        megabyte = 1024*1024
+
+        if part_size is None:
+            # round up to full megabytes
+            part_size = -(-file_size // self.MULTIPART_TARGET_PARTS)
+            part_size = -(-part_size // megabyte) * megabyte
+
+        # stay within the part count limit
+        part_size = max(part_size,
+                        -(-file_size // self.MULTIPART_MAX_PARTS))
+
+        return min(max(part_size, self.MULTIPART_CHUNKSIZE),
+                   self.MULTIPART_MAX_CHUNKSIZE)
+
+    def get_part_concurrency(self,
+                             file_size,
+                             part_size,
+                             part_jobs=None):
+        """
+        Determine the number of parts that are uploaded concurrently
+        for a file with the specified size.
+
+        :param file_size: file size in bytes
+        :type file_size: int
+
+        :param part_size: part size in bytes
+        :type part_size: int
+
+        :param part_jobs: maximum number of concurrent part uploads;
+        defaults to MULTIPART_CONCURRENCY
+        :type part_jobs: int
+
+        :returns: number of concurrent part uploads
+        :rtype: int
+        """
+
+        part_count = max(1, -(-file_size // part_size))
+        return max(1, min(part_count,
+                          part_jobs or self.MULTIPART_CONCURRENCY))
+
     def upload_object(self,
                       file,
                       bucket_name,
-                      object_key):
+                      object_key,
+                      part_size=None,
+                      part_jobs=None,
+                      journal_dir=None):
         """
         Upload a file to the specified bucket name, using object_key
         as key.
@@ -327,6 +753,23 @@ class COSWrapper:
         :param object_key: the object key that will be assigned to the file
         :type object_key: str
 
+        :param part_size: part size in bytes for multipart uploads;
+        by default the part size is derived from the file size
+        :type part_size: int
+
+        :param part_jobs: maximum number of parts that are uploaded
+        concurrently; by default up to MULTIPART_CONCURRENCY
+        :type part_jobs: int
+
+        :param journal_dir: if specified, the progress of multipart
+        uploads is recorded in a journal in this directory and an
+        interrupted upload of the same file is resumed, uploading
+        only missing parts
+        :type journal_dir: str
+
+        :returns: ETag of the object (without quotes)
+        :rtype: str
+
         :raises BucketNotFoundError: bucket_name was not found
         :raises ValueError: bucket_name is invalid
         :raises FileNotFoundError: file was not found
@@ -335,15 +778,48 @@ class COSWrapper:
 
         try:
             with open(file, 'rb') as data:
-                # take advantage of multi-part uploads for
-                # files larger than 15 MB
+                file_size = os.fstat(data.fileno()).st_size
+
+                if file_size < self.MULTIPART_THRESHOLD:
+                    # small files are uploaded with a single request;
+                    # skip the transfer manager and its thread pool
+                    response = self.client.put_object(Bucket=bucket_name,
+                                                      Key=object_key,
+                                                      Body=data)
+                    return response['ETag'].strip('"')
+
+                # pick part size and concurrency based on the file size
+                chunksize = self.get_part_size(file_size,
+                                               part_size)
+                concurrency = self.get_part_concurrency(file_size,
+                                                        chunksize,
+                                                        part_jobs)
+
+                if journal_dir:
+                    return self._upload_resumable(file,
+                                                  file_size,
+                                                  bucket_name,
+                                                  object_key,
+                                                  chunksize,
+                                                  concurrency,
+                                                  journal_dir)
+
                 config = ibm_boto3.s3.transfer.TransferConfig(
-                                            multipart_threshold=1024*1024*15,
-                                            multipart_chunksize=1024*1024*5)
-                # upload file
-                self.cos.Object(bucket_name, object_key)\
+                            multipart_threshold=self.MULTIPART_THRESHOLD,
+                            multipart_chunksize=chunksize,
+                            max_concurrency=concurrency)
+                # upload file; unlike resources the low-level
+                # client can be shared by multiple threads
+                self.client\
                     .upload_fileobj(Fileobj=data,
+                                    Bucket=bucket_name,
+                                    Key=object_key,
                                     Config=config)
+                # the transfer manager doesn't return the ETag, which
+                # identifies unchanged files in sync mode
+                response = self.client.head_object(Bucket=bucket_name,
+                                                   Key=object_key)
+                return response['ETag'].strip('"')
 
         except FileNotFoundError:
             raise
@@ -366,36 +842,307 @@ class COSWrapper:
             # print('Exception: {}'.format(ex))
             raise COSWrapperError(ex)
 
+    def _upload_resumable(self,
+                          file,
+                          file_size,
+                          bucket_name,
+                          object_key,
+                          part_size,
+                          part_jobs,
+                          journal_dir):
+        """
+        Upload file using a multipart upload whose progress is recorded
+        in a journal. The first journal line identifies the file, the
+        part size and the multipart upload id. Every following line
+        records the ETag of an uploaded part. If a journal for the file
+        exists, parts that the server confirms are not uploaded again.
+        """
+
+        client = self.client
+        header = {
+            'bucket': bucket_name,
+            'key': object_key,
+            'file': os.path.abspath(file),
+            'size': file_size,
+            'mtime': os.stat(file).st_mtime_ns,
+            'part_size': part_size
+        }
+        journal = os.path.join(journal_dir,
+                               '{}.journal'.format(
+                                   hashlib.sha1(
+                                       json.dumps([bucket_name,
+                                                   object_key,
+                                                   header['file']])
+                                       .encode('utf-8')).hexdigest()))
+        upload_id = None
+        parts = {}
+
+        # load journal of an interrupted upload
+        try:
+            with open(journal, 'r') as log:
+                lines = log.read().splitlines()
+            entry = json.loads(lines[0])
+            if {name: entry.get(name) for name in header} == header:
+                upload_id = entry['upload_id']
+                for line in lines[1:]:
+                    try:
+                        part = json.loads(line)
+                        parts[part['part']] = part['etag']
+                    except (ValueError, TypeError, KeyError):
+                        # the line was only partly written when the
+                        # upload was interrupted
+                        break
+            else:
+                # the file or the part size has changed
+                try:
+                    client.abort_multipart_upload(
+                        Bucket=bucket_name,
+                        Key=object_key,
+                        UploadId=entry['upload_id'])
+                except ClientError:
+                    pass
+        except (OSError, ValueError, IndexError, KeyError):
+            # the journal doesn't exist or its header is incomplete
+            pass
+
+        if upload_id:
+            # only skip parts that the server has received
+            try:
+                uploaded = {}
+                for page in client.get_paginator('list_parts')\
+                                  .paginate(Bucket=bucket_name,
+                                            Key=object_key,
+                                            UploadId=upload_id):
+                    for part in page.get('Parts', []):
+                        uploaded[part['PartNumber']] = part['ETag']
+                parts = {number: etag
+                         for number, etag in parts.items()
+                         if uploaded.get(number) == etag}
+            except ClientError as ce:
+                if ce.response.get('Error', {}).get('Code') != \
+                   'NoSuchUpload':
+                    raise
+                # the upload was completed or aborted
+                upload_id = None
+
+        if not upload_id:
+            upload_id = client.create_multipart_upload(
+                            Bucket=bucket_name,
+                            Key=object_key)['UploadId']
+            parts = {}
+
+        # (re)write the journal, dropping an incomplete last line, so
+        # that new part records start on a line of their own
+        os.makedirs(journal_dir, exist_ok=True)
+        with open(journal, 'w') as log:
+            log.write(json.dumps(dict(header, upload_id=upload_id)))
+            log.write('\n')
+            for number in sorted(parts):
+                log.write(json.dumps({'part': number,
+                                      'etag': parts[number]}))
+                log.write('\n')
+
+        lock = threading.Lock()
+        part_count = max(1, -(-file_size // part_size))
+        missing = [number for number in range(1, part_count + 1)
+                   if number not in parts]
+
+        with open(journal, 'a') as log:
+
+            def upload_part(number):
+                with open(file, 'rb') as data:
+                    data.seek((number - 1) * part_size)
+                    body = data.read(part_size)
+                etag = client.upload_part(Bucket=bucket_name,
+                                          Key=object_key,
+                                          UploadId=upload_id,
+                                          PartNumber=number,
+                                          Body=body)['ETag']
+                with lock:
+                    parts[number] = etag
+                    log.write(json.dumps({'part': number, 'etag': etag}))
+                    log.write('\n')
+                    log.flush()
+                return True
+
+            _, failures = run_tasks(upload_part, missing, part_jobs)
+
+        if failures:
+            # the journal is kept; raise the first error
+            raise failures[0][1]
+
+        response = client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=object_key,
+            UploadId=upload_id,
+            MultipartUpload={
+                'Parts': [{'PartNumber': number, 'ETag': parts[number]}
+                          for number in sorted(parts)]
+            })
+        os.remove(journal)
+        return response['ETag'].strip('"')
+
+    def abort_multipart_uploads(self,
+                                bucket_name,
+                                key_name_prefix='',
+                                older_than=None,
+                                jobs=4):
+        """
+        Abort incomplete multipart uploads for keys that start with
+        key_name_prefix, discarding the parts that were uploaded.
+
+        :param bucket_name: bucket name
+        :type bucket_name: str
+
+        :param key_name_prefix: key name prefix
+        :type key_name_prefix: str
+
+        :param older_than: if specified, only uploads that were
+        initiated at least this long ago are aborted
+        :type older_than: datetime.timedelta
+
+        :param jobs: maximum number of concurrent abort requests;
+        defaults to 4
+        :type jobs: int
+
+        :returns: number of aborted uploads
+        :rtype: int
+
+        :raises BucketNotFoundError: bucket_name was not found
+        :raises ValueError: bucket_name is invalid
+        :raises COSWrapperError: an error occurred
+        """
+
+        if key_name_prefix is None:
+            key_name_prefix = ''
+
+        client = self.client
+
+        def list_uploads():
+            now = datetime.datetime.now(datetime.timezone.utc)
+            for page in client.get_paginator('list_multipart_uploads')\
+                              .paginate(Bucket=bucket_name,
+                                        Prefix=key_name_prefix):
+                for upload in page.get('Uploads', []):
+                    if older_than is None or \
+                       now - upload['Initiated'] >= older_than:
+                        yield upload
+
+        def abort(upload):
+            client.abort_multipart_upload(Bucket=bucket_name,
+                                          Key=upload['Key'],
+                                          UploadId=upload['UploadId'])
+            return True
+
+        try:
+            count, failures = run_tasks(abort, list_uploads(), jobs)
+            if failures:
+                # raise the first error; map it below
+                raise failures[0][1]
+            return count
+
+        except ClientError as ce:
+            # print('Exception type: {}'.format(type(ce)))
+            # print('Exception: {}'.format(ce))
+            # print('Response: ', ce.response)
+            if ce.response.get('Error', {}).get('Code') == '404' or \
+               ce.response.get('Error', {}).get('Code') == 'NoSuchBucket':
+                raise BucketNotFoundError('Bucket "{}" was not found'
+                                          .format(bucket_name))
+            if ce.response.get('Error', {}).get('Code') == '403' or \
+               ce.response.get('Error', {}).get('Code') == 'AccessDenied':
+                raise ValueError('Bucket "{}" exists '
+                                 'but access is denied.'
+                                 .format(bucket_name))
+            raise COSWrapperError(ce)
+        except Exception as ex:
+            # print('Exception type: {}'.format(type(ex)))
+            # print('Exception: {}'.format(ex))
+            raise COSWrapperError(ex)
+
     def delete_objects(self,
                        bucket_name,
-                       object_keys):
+                       object_keys,
+                       jobs=1):
         """
-        Deletes the specified objects from the named bucket.
+        Deletes the specified objects from the named bucket. Objects
+        are deleted in batches of up to 1000 keys while object_keys
+        is consumed.
 
         :param bucket_name: name of the bucket where file will be stored
         :type bucket_name: str
 
         :param object_keys: object keys to be deleted
-        :type object_keys: list
+        :type object_keys: iterable
+
+        :param jobs: maximum number of concurrent delete requests;
+        defaults to 1
+        :type jobs: int
+
+        :returns: number of deleted objects
+        :rtype: int
 
         :raises BucketNotFoundError: bucket_name was not found
         :raises ValueError: bucket_name is invalid
         :raises COSWrapperError: an error occurred
         """
 
-        try:
+        count = 0
+        # objects that could not be deleted
+        errors = []
+
+        def batches():
+            nonlocal count
             keys = []
-            count = 0
-            total = len(object_keys)
             # delete objects in batches; max batch size is 1000
             for object_key in object_keys:
                 keys.append({'Key': object_key})
                 count += 1
-                if count % 1000 == 0 or count == total:
-                    payload = {'Objects': keys}
-                    self.cos.Bucket(bucket_name).delete_objects(Delete=payload)
+                if len(keys) == 1000:
+                    yield keys
                     keys = []
+            if keys:
+                yield keys
+
+        def delete_batch(keys):
+            # in quiet mode the response only lists keys that
+            # could not be deleted
+            response = self.client\
+                           .delete_objects(Bucket=bucket_name,
+                                           Delete={
+                                               'Objects': keys,
+                                               'Quiet': True
+                                           })
+            errors.extend(response.get('Errors', []))
+            return True
 
+        try:
+            _, failures = run_tasks(delete_batch,
+                                    batches(),
+                                    jobs)
+            if failures:
+                # raise the first error; map it below
+                raise failures[0][1]
+
+            if errors:
+                # report (up to ten) objects that were not deleted
+                details = ['"{}": {}'.format(error.get('Key'),
+                                             error.get('Message',
+                                                       error.get('Code')))
+                           for error in errors[:10]]
+                raise COSWrapperError('{} object(s) could not be '
+                                      'deleted: {}'
+                                      .format(len(errors),
+                                              '; '.join(details)))
+
+            return count
+
+        except COSWrapperError:
+            raise
+        except BucketNotFoundError:
+            raise
+        except ValueError:
+            raise
         except ClientError as ce:
             # print('Exception type: {}'.format(type(ce)))
             # print('Exception: {}'.format(ce))
@@ -440,7 +1187,13 @@ class COSWrapper:
     def download_object(self,
                         bucket_name,
                         object_key,
-                        target):
+                        target,
+                        resume=False,
+                        range_size=None,
+                        range_jobs=None,
+                        size=None,
+                        etag=None,
+                        progress=True):
         """ Download S3 Object
             :param bucket_name: the object's bucket_name identifier
             :type bucket_name: str
@@ -448,6 +1201,29 @@ class COSWrapper:
             :type object_key: str
             :param target: file name (including optional path) of download
             :type target: str
+            :param resume: download to a temporary .part file, which
+            is renamed when the download completes, and continue an
+            interrupted download of the same object version
+            :type resume: bool
+            :param range_size: size of the byte ranges that are
+            fetched concurrently if range_jobs is greater than 1;
+            defaults to RANGE_SIZE
+            :type range_size: int
+            :param range_jobs: maximum number of byte ranges of a large
+            object that are fetched concurrently; defaults to None
+            (objects are not split into ranges). Ignored if resume
+            is set.
+            :type range_jobs: int
+            :param size: the object's size, if known (e.g. from an
+            object listing); objects smaller than MULTIPART_THRESHOLD
+            are then fetched with a single request
+            :type size: int
+            :param etag: the object's ETag, if known
+            :type etag: str
+            :param progress: print a dot for every chunk that was
+            received and a line break when the download completes;
+            disable if other threads print at the same time
+            :type progress: bool
             :returns:
             :rtype: str
             :raises BucketNotFoundError: bucket_name does not exist
@@ -457,8 +1233,6 @@ class COSWrapper:
 
         # print('{} {} {}'.format(bucket_name, object_key, target))
 
-        object = self.cos.Object(bucket_name, object_key)
-
         try:
 
             if object_key.endswith('/'):
@@ -481,13 +1255,75 @@ class COSWrapper:
                 # try to create the target's directory
                 os.makedirs(path, exist_ok=True)
 
-            # callback
-            def callback(transferred_bytes):
-                print('.', end='', flush=True)
+            # the transfer manager invokes the callback in its own
+            # threads; print in (a copy of) the calling thread's context,
+            # which routes the output of daemon operations to the client
+            context = contextvars.copy_context() \
+                if contextvars is not None else None
 
-            object.download_file(target, Callback=callback)
+            # callback; byte ranges are fetched concurrently, therefore
+            # each progress indicator is printed in a single write
+            def callback(transferred_bytes):
+                if not progress:
+                    return
+                if context is None:
+                    print('.', end='', flush=True)
+                else:
+                    # a context cannot be entered by several threads
+                    # at the same time
+                    context.copy().run(print, '.', end='', flush=True)
+
+            def done():
+                if progress:
+                    print('\n', end='')
+
+            if size is not None and size < self.MULTIPART_THRESHOLD \
+               and not resume:
+                # small objects are fetched with a single request; the
+                # transfer manager would first look up the object size
+                self._download_small(bucket_name,
+                                     object_key,
+                                     target,
+                                     callback)
+                done()
+                return target
 
-            print()
+            if range_jobs and range_jobs > 1 and not resume:
+                # ranged downloads always start over; resumable
+                # downloads continue at the end of target.part
+                range_size = range_size or self.RANGE_SIZE
+                if size is None or etag is None:
+                    head = self.client\
+                               .head_object(Bucket=bucket_name,
+                                            Key=object_key)
+                    size = head['ContentLength']
+                    etag = head['ETag']
+                if size > range_size:
+                    self._download_ranges(bucket_name,
+                                          object_key,
+                                          target,
+                                          size,
+                                          etag,
+                                          range_size,
+                                          range_jobs,
+                                          callback)
+                    done()
+                    return target
+
+            if resume:
+                self._download_resumable(bucket_name,
+                                         object_key,
+                                         target,
+                                         callback)
+            else:
+                # unlike resources the low-level client can be shared
+                # by multiple threads
+                self.client.download_file(bucket_name,
+                                          object_key,
+                                          target,
+                                          Callback=callback)
+
+            done()
             return target
         except BucketNotFoundError:
             raise
@@ -495,7 +1331,8 @@ class COSWrapper:
             raise
         except ClientError as ce:
             if ce.response.get('Error', {}).get('Code') == '404' or \
-               ce.response.get('Error', {}).get('Code') == 'NoSuchBucket':
+               ce.response.get('Error', {}).get('Code') == 'NoSuchBucket' or \
+               ce.response.get('Error', {}).get('Code') == 'NoSuchKey':
                 raise BucketNotFoundError(
                     'Bucket {} or object key {} was not found'
                     .format(bucket_name,
@@ -510,3 +1347,171 @@ class COSWrapper:
             # print('Exception type: {}'.format(type(ex)))
             # print('Exception: {}'.format(ex))
             raise COSWrapperError(ex)
+
+    def _download_small(self,
+                        bucket_name,
+                        object_key,
+                        target,
+                        callback):
+        """
+        Download an object using a single GET request, streaming the
+        content to target.part, which is renamed when the download
+        completes.
+        """
+
+        part = '{}.part'.format(target)
+        response = self.client.get_object(Bucket=bucket_name,
+                                          Key=object_key)
+        with open(part, 'wb') as data:
+            for chunk in response['Body'].iter_chunks(1024*1024):
+                data.write(chunk)
+                callback(len(chunk))
+        self._complete_download(part, target)
+
+    def _download_resumable(self,
+                            bucket_name,
+                            object_key,
+                            target,
+                            callback):
+        """
+        Download an object to target.part and rename the file when
+        the download completes. The ETag of the object is stored in
+        target.part.etag. If both files exist, the download continues
+        at the end of target.part, provided that the object's ETag has
+        not changed. Otherwise the download starts over.
+        """
+
+        client = self.client
+        part = '{}.part'.format(target)
+        etag_file = '{}.etag'.format(part)
+
+        offset = 0
+        etag = None
+        try:
+            with open(etag_file, 'r') as data:
+                etag = data.read().strip()
+            offset = os.path.getsize(part)
+        except OSError:
+            pass
+
+        response = None
+        if offset and etag:
+            try:
+                # only fetch the remainder of the same object version
+                response = client.get_object(Bucket=bucket_name,
+                                             Key=object_key,
+                                             Range='bytes={}-'.format(offset),
+                                             IfMatch=etag)
+                if not response.get('ContentRange'):
+                    # the entire object was returned
+                    offset = 0
+            except ClientError as ce:
+                if ce.response.get('Error', {}).get('Code') not in \
+                   ['PreconditionFailed', 'InvalidRange', '412', '416']:
+                    raise
+                # the object has changed; start over
+                response = None
+
+        if response is None:
+            offset = 0
+            response = client.get_object(Bucket=bucket_name,
+                                         Key=object_key)
+            with open(etag_file, 'w') as data:
+                data.write(response['ETag'])
+
+        with open(part, 'r+b' if offset else 'wb') as data:
+            data.seek(offset)
+            data.truncate()
+            for chunk in response['Body'].iter_chunks(1024*1024):
+                data.write(chunk)
+                callback(len(chunk))
+
+        self._complete_download(part, target)
+
+    def _download_ranges(self,
+                         bucket_name,
+                         object_key,
+                         target,
+                         size,
+                         etag,
+                         range_size,
+                         range_jobs,
+                         callback):
+        """
+        Download an object of the specified size by fetching byte
+        ranges concurrently. The ranges are written at their offsets
+        into target.part, which is allocated upfront and renamed when
+        all ranges were downloaded.
+        """
+
+        client = self.client
+        part = '{}.part'.format(target)
+        lock = threading.Lock()
+
+        fd = os.open(part,
+                     os.O_RDWR | os.O_CREAT | os.O_TRUNC |
+                     getattr(os, 'O_BINARY', 0),
+                     0o666)
+
+        def write(data, offset):
+            view = memoryview(data)
+            while view:
+                if hasattr(os, 'pwrite'):
+                    written = os.pwrite(fd, view, offset)
+                else:
+                    with lock:
+                        os.lseek(fd, offset, os.SEEK_SET)
+                        written = os.write(fd, view)
+                # handle partial writes
+                view = view[written:]
+                offset = offset + written
+
+        def fetch(offset):
+            # all ranges must belong to the same object version
+            response = client.get_object(
+                            Bucket=bucket_name,
+                            Key=object_key,
+                            Range='bytes={}-{}'.format(
+                                offset,
+                                min(offset + range_size, size) - 1),
+                            IfMatch=etag)
+            for chunk in response['Body'].iter_chunks(1024*1024):
+                write(chunk, offset)
+                offset = offset + len(chunk)
+                callback(len(chunk))
+            return True
+
+        try:
+            # reserve disk space for the object
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(fd, 0, size)
+            else:
+                os.ftruncate(fd, size)
+
+            _, failures = run_tasks(fetch,
+                                    range(0, size, range_size),
+                                    range_jobs)
+            if failures:
+                # raise the first error
+                raise failures[0][1]
+        except BaseException:
+            os.close(fd)
+            os.remove(part)
+            raise
+
+        os.close(fd)
+        self._complete_download(part, target)
+
+    def _complete_download(self,
+                           part,
+                           target):
+        """
+        Rename the downloaded part file to target and remove the ETag
+        file that an interrupted resumable download might have left.
+        """
+
+        os.replace(part, target)
+        try:
+            os.remove('{}.etag'.format(part))
+        except FileNotFoundError:
+            pass
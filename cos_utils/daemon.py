@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+# This utility runs a local daemon that performs operations on behalf
+# of the other utilities. The daemon keeps Cloud Object Storage
+# connections open across invocations, which removes the start-up,
+# connection and connectivity test overhead from short invocations.
+# The utilities send operations to the daemon if it is running and
+# perform them in-process otherwise.
+#
+
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+
+from .records import ObjectRecord, decode_record, encode_record
+
+try:
+    import contextvars
+except ImportError:
+    # Python 3.6
+    contextvars = None
+
+
+# operations that the daemon performs and their parameters that
+# identify local paths, which are resolved relative to the working
+# directory of the client; parameters that are not specified (or None)
+# are set to the listed default path, unless the default is None
+OPERATIONS = {
+    'cos_utils.abort_uploads.do_abort': {},
+    'cos_utils.download_files.do_download': {'target_dir': ''},
+    'cos_utils.list_buckets.do_list': {},
+    'cos_utils.list_files.iter_list': {},
+    'cos_utils.remove_files.do_remove': {},
+    'cos_utils.upload_files.do_upload': {'pattern': None,
+                                         'ignore_file': None}
+}
+
+# maximum size of a request
+MAX_REQUEST_SIZE = 1024*1024
+
+
+class DaemonError(Exception):
+    pass
+
+
+def get_socket_path():
+    """
+    Return the location of the daemon's Unix socket, which is
+    defined by environment variable COS_UTILS_SOCKET or defaults
+    to cos_utils.sock in $XDG_RUNTIME_DIR or ~/.cos_utils.
+
+    :return: socket path
+    :rtype: str
+    """
+
+    if os.environ.get('COS_UTILS_SOCKET'):
+        return os.environ['COS_UTILS_SOCKET']
+
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'],
+                            'cos_utils.sock')
+
+    return os.path.join(os.path.expanduser('~'),
+                        '.cos_utils',
+                        'cos_utils.sock')
+
+
+def _encode(value):
+    # timedeltas are passed to operations; listings return records
+    if isinstance(value, datetime.timedelta):
+        return {'__timedelta__': value.total_seconds()}
+    if isinstance(value, ObjectRecord):
+        return {'__record__': encode_record(value)}
+    raise TypeError('{} is not JSON serializable'.format(type(value)))
+
+
+def _decode(value):
+    if '__timedelta__' in value:
+        return datetime.timedelta(seconds=value['__timedelta__'])
+    if '__record__' in value:
+        return decode_record(value['__record__'])
+    return value
+
+
+def _connect(socket_path=None):
+    """
+    Connect to the daemon. Returns None if no daemon is running.
+    """
+
+    socket_path = socket_path or get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+
+    # imported here to keep the start-up time of the utilities low
+    import socket
+
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        # stale socket file
+        sock.close()
+        return None
+    return sock
+
+
+def call(function, *args, **kwargs):
+    """
+    Perform an operation in the daemon if one is running, or in the
+    calling process otherwise. Output that the operation prints in
+    the daemon is printed by the calling process.
+
+    :param function: operation; operations that are not listed in
+    OPERATIONS are always performed in the calling process
+    :type function: callable
+    :raises DaemonError: the connection to the daemon was lost
+    :return: result of the operation
+    """
+
+    module = function.__module__
+    if module == '__main__' and sys.modules['__main__'].__spec__:
+        # the utility was launched using python -m
+        module = sys.modules['__main__'].__spec__.name
+    name = '{}.{}'.format(module, function.__name__)
+
+    sock = None
+    if name in OPERATIONS:
+        sock = _connect()
+    if sock is None:
+        # no daemon is running
+        return function(*args, **kwargs)
+
+    # imported here to keep the start-up time of the utilities low
+    import inspect
+
+    arguments = inspect.signature(function).bind(*args, **kwargs).arguments
+    request = {
+        'operation': name,
+        'arguments': dict(arguments),
+        'cwd': os.getcwd()
+    }
+
+    try:
+        sock.sendall(json.dumps(request, default=_encode)
+                     .encode('utf-8') + b'\n')
+    except OSError as ex:
+        sock.close()
+        raise DaemonError('Cannot send request to the daemon: {}'
+                          .format(ex))
+
+    responses = _read_responses(sock)
+    response = next(responses)
+    if 'stream' not in response:
+        responses.close()
+        return response['result']
+
+    # the operation returned an iterator; keep the
+    # connection open while its items are consumed
+    return _iter_items(responses)
+
+
+def _read_responses(sock):
+    """
+    Yield the responses that the daemon sends, printing output and
+    raising errors. Closes sock when done.
+    """
+
+    with sock, sock.makefile('r', encoding='utf-8') as responses:
+        for line in responses:
+            response = json.loads(line, object_hook=_decode)
+            if 'output' in response:
+                sys.stdout.write(response['output'])
+                sys.stdout.flush()
+            elif 'error' in response:
+                raise DaemonError(response['error'])
+            else:
+                yield response
+    raise DaemonError('The connection to the daemon was lost.')
+
+
+def _iter_items(responses):
+    try:
+        for response in responses:
+            if 'end' in response:
+                return
+            yield response['item']
+    finally:
+        responses.close()
+
+
+class _OutputRouter:
+    """
+    Replaces sys.stdout in the daemon; sends output that an operation
+    prints to the client that requested the operation
+    """
+
+    def __init__(self, stream, send):
+        self._stream = stream
+        self._send = send
+
+    def write(self, text):
+        send = self._send.get()
+        if send is None:
+            return self._stream.write(text)
+        if text:
+            send({'output': text})
+        return len(text)
+
+    def flush(self):
+        if self._send.get() is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def serve(socket_path=None,
+          verbose=False,
+          stop=None):
+    """
+    Run the daemon until it is interrupted or terminated.
+
+    :param socket_path: location of the Unix socket, defaults
+    to None (see get_socket_path)
+    :type socket_path: str, optional
+    :param verbose: print diagnostic information, defaults to False
+    :type verbose: bool, optional
+    :param stop: the daemon also stops when this event is set,
+    defaults to None
+    :type stop: threading.Event, optional
+    :raises DaemonError: the daemon cannot be started
+    """
+
+    # imported here to keep the start-up time of the utilities low
+    import importlib
+    import inspect
+    import signal
+    import socket
+    import socketserver
+
+    if contextvars is None:
+        raise DaemonError('The daemon requires Python 3.7 or later.')
+
+    if not hasattr(socket, 'AF_UNIX'):
+        raise DaemonError('The daemon requires Unix domain sockets.')
+
+    socket_path = socket_path or get_socket_path()
+
+    sock = _connect(socket_path)
+    if sock is not None:
+        sock.close()
+        raise DaemonError('A daemon is already listening on "{}".'
+                          .format(socket_path))
+
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)),
+                mode=0o700,
+                exist_ok=True)
+    if os.path.exists(socket_path):
+        # remove stale socket file
+        os.unlink(socket_path)
+
+    # output of the operation that the current thread performs
+    send_output = contextvars.ContextVar('send_output', default=None)
+
+    class Handler(socketserver.StreamRequestHandler):
+
+        def handle(self):
+            lock = threading.Lock()
+
+            def send(response):
+                """
+                Send response to the client. Returns False if the
+                client disconnected.
+                """
+                data = json.dumps(response, default=_encode)
+                try:
+                    with lock:
+                        self.wfile.write(data.encode('utf-8') + b'\n')
+                        self.wfile.flush()
+                except OSError:
+                    return False
+                return True
+
+            try:
+                request = json.loads(self.rfile
+                                         .readline(MAX_REQUEST_SIZE)
+                                         .decode('utf-8'),
+                                     object_hook=_decode)
+                name = request['operation']
+                if name not in OPERATIONS:
+                    raise DaemonError('Operation "{}" is not supported.'
+                                      .format(name))
+                arguments = request['arguments']
+                for path, default in OPERATIONS[name].items():
+                    value = arguments.get(path)
+                    if value is None:
+                        value = default
+                    if value is not None:
+                        # resolve paths relative to the client's directory
+                        arguments[path] = os.path.join(request['cwd'],
+                                                       value)
+            except Exception as ex:
+                send({'error': 'Invalid request: {}'.format(ex)})
+                return
+
+            if verbose:
+                print('{} {}'.format(name, arguments.get('bucket') or '')
+                      .rstrip())
+
+            send_output.set(send)
+            try:
+                module, function = name.rsplit('.', 1)
+                function = getattr(importlib.import_module(module), function)
+                result = function(**arguments)
+                if inspect.isgenerator(result):
+                    try:
+                        if send({'stream': True}):
+                            for item in result:
+                                if not send({'item': item}):
+                                    # the client disconnected; stop
+                                    # producing items
+                                    break
+                            else:
+                                send({'end': True})
+                    finally:
+                        result.close()
+                else:
+                    send({'result': result})
+            except Exception as ex:
+                send({'error': str(ex)})
+            finally:
+                send_output.set(None)
+
+    class Server(socketserver.ThreadingMixIn,
+                 socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    # only the current user may connect
+    umask = os.umask(0o177)
+    try:
+        server = Server(socket_path, Handler)
+    finally:
+        os.umask(umask)
+
+    def terminate(signum, frame):
+        sys.exit(0)
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, terminate)
+
+    if stop is not None:
+
+        def wait_for_stop():
+            stop.wait()
+            server.shutdown()
+
+        threading.Thread(target=wait_for_stop, daemon=True).start()
+
+    if verbose:
+        print('Listening on "{}"'.format(socket_path))
+
+    stdout = sys.stdout
+    sys.stdout = _OutputRouter(stdout, send_output)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout = stdout
+        server.server_close()
+        os.unlink(socket_path)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Run a daemon that '
+                                                 'performs Cloud Object '
+                                                 'Storage operations on '
+                                                 'behalf of the other '
+                                                 'utilities.')
+    parser.add_argument('-s',
+                        '--socket',
+                        help='Unix socket path. Defaults to '
+                             '$COS_UTILS_SOCKET or cos_utils.sock in '
+                             '$XDG_RUNTIME_DIR.')
+    parser.add_argument('-v',
+                        '--verbose',
+                        help='Log operations',
+                        action='store_true')
+
+    # parse command line parameters
+    args = parser.parse_args()
+
+    try:
+        serve(args.socket, verbose=args.verbose)
+    except Exception as ex:
+        print('Error. {}'.format(ex))
+        # exit with non-zero return code
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
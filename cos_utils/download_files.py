@@ -23,12 +23,13 @@
 
 import argparse
 import os
-import re
 import sys
 
 from pathlib import Path
 
-from .cos import COSWrapper, COSWrapperError
+from .daemon import call
+from .parallel import run_tasks
+from .patterns import KeyMatcher
 
 
 class DownloadError(Exception):
@@ -40,7 +41,14 @@ def do_download(bucket,
                 access_key_id,
                 secret_access_key,
                 target_dir=os.getcwd(),
-                verbose=False):
+                verbose=False,
+                jobs=1,
+                sync=False,
+                resume=False,
+                range_size=None,
+                range_jobs=None,
+                warm_up=False,
+                cos_wrapper=None):
     """
     Download the objects(s) identified by source_spec
     from the specified Cloud Object Storage bucket to
@@ -49,8 +57,9 @@ def do_download(bucket,
     :param bucket: Source bucket name. (Must exist)
     :type bucket: str
     :param source_spec: Identifies an object or multiple objects
-    in bucket.
-    :type source_spec: str
+    in bucket. Pass a list to download the objects that match any
+    of several specifications.
+    :type source_spec: str or list(str)
     :param access_key_id: HMAC access key id
     :type access_key_id: str
     :param secret_access_key: HMAC secret access key
@@ -58,23 +67,50 @@ def do_download(bucket,
     :param target_dir: Directory where objects shall be stored. This
     directory must exist and be writable. Defaults to the current directory.
     :type target_dir: str, optional
+    :param verbose: print diagnostic information, defaults to False
+    :type verbose: bool, optional
+    :param jobs: maximum number of concurrent downloads, defaults to 1
+    :type jobs: int, optional
+    :param sync: skip objects that were already downloaded to target_dir,
+    defaults to False
+    :type sync: bool, optional
+    :param resume: continue interrupted downloads, defaults to False
+    :type resume: bool, optional
+    :param range_size: size in bytes of the byte ranges that are
+    fetched concurrently for large objects, defaults to None (64 MB)
+    :type range_size: int, optional
+    :param range_jobs: maximum number of byte ranges of a single object
+    that are fetched concurrently, defaults to None (no ranged downloads);
+    ignored if resume is set
+    :type range_jobs: int, optional
+    :param warm_up: open connections to the service before the
+    download starts, defaults to False
+    :type warm_up: bool, optional
+    :param cos_wrapper: wrapper to be used instead of a (cached)
+    wrapper for the specified credentials, defaults to None
+    :type cos_wrapper: COSWrapper, optional
     :raises ValueError: A required parameter value is missing.
     :raises DownloadError: Download failed due to the specified reason.
-    :return: number of downloaded objects
+    :return: number of downloaded objects (excluding unchanged
+    objects that were skipped in sync mode)
     :rtype: int
     """
 
+    # the SDK is imported on demand to keep the startup time low
+    from .cos import COSWrapperError, get_cos_wrapper
+
     if not bucket:
         raise ValueError('Parameter "bucket" is required')
 
     if not source_spec:
         raise ValueError('Parameter "source_spec" is required')
 
-    if not access_key_id:
-        raise ValueError('Parameter "access_key_id" is required')
+    if cos_wrapper is None:
+        if not access_key_id:
+            raise ValueError('Parameter "access_key_id" is required')
 
-    if not secret_access_key:
-        raise ValueError('Parameter "secret_access_key" is required')
+        if not secret_access_key:
+            raise ValueError('Parameter "secret_access_key" is required')
 
     # verify that target_dir is valid
     if not target_dir:
@@ -86,52 +122,144 @@ def do_download(bucket,
 
     target_dir = os.path.abspath(target_dir)
 
+    # jobs=None runs downloads sequentially
+    jobs = max(jobs or 1, 1)
+
+    max_pool_connections = jobs * max(range_jobs or 1, 1)
+
     try:
-        # instantiate Cloud Object Storage wrapper
-        cw = COSWrapper(access_key_id,
-                        secret_access_key,
-                        connectivity_test_bucket=bucket)
+        # reuse the wrapper for these credentials, if one exists;
+        # its connection pool must accommodate all concurrent requests
+        cw = cos_wrapper or \
+            get_cos_wrapper(access_key_id,
+                            secret_access_key,
+                            max_pool_connections=max_pool_connections)
+        # connectivity is only verified once per wrapper and bucket
+        cw.verify_connectivity(bucket)
+        if warm_up:
+            # open connections before the first transfer starts
+            cw.warm_up(bucket, max_pool_connections)
     except COSWrapperError as cwe:
         raise DownloadError('Cannot access Cloud Object Storage: {}'
                             .format(cwe))
 
-    # fetch list of objects in the bucket
+    # precompile source specifications
+    specs = [source_spec] if isinstance(source_spec, str) \
+        else list(source_spec)
     try:
-        objects = cw.get_object_list(bucket)
-    except Exception as ex:
-        raise DownloadError('Listing of bucket "{}" failed: {}'
-                            .format(bucket, ex))
-
-    # sanitize source specification
-    pattern = source_spec.replace('.', '\\.')
-    pattern = pattern.replace('*', '.*')
-    pattern = pattern.replace('?', '.?')
-    pattern = '^{}$'.format(pattern)
-    # precompile pattern
-    prog = re.compile(pattern)
+        matcher = KeyMatcher(specs)
+    except ValueError as ve:
+        raise DownloadError(ve)
+    # specifications that matched at least one object
+    hits = set()
+
+    def list_sources():
+        """
+        Yield (object, target) tuples for the objects to be downloaded,
+        where object is the listing entry (with Key, Size, ETag and
+        LastModified properties) for the object
+        """
+        nonlocal source_count
+        try:
+            # fetch list of objects in the bucket, limiting the listing
+            # to keys that start with the literal part of a specification
+            for prefix in matcher.prefixes():
+                for page in cw.iter_object_pages(bucket, prefix):
+                    for object in page:
+                        # apply specifications to object key
+                        matches = matcher.match(object['Key'])
+                        if not matches:
+                            continue
+
+                        hits.update(matches)
+                        source_count = source_count + 1
+
+                        yield object, str(Path(target_dir)
+                                          .joinpath(object['Key']))
+        except Exception as ex:
+            raise DownloadError('Listing of bucket "{}" failed: {}'
+                                .format(bucket, ex))
+
+    def is_unchanged(object, target):
+        """
+        Returns True if target has the same size and modification
+        time as object
+        """
+        if object['Key'].endswith('/'):
+            # the object represents a directory
+            return os.path.isdir(target)
+        try:
+            stat = os.stat(target)
+        except OSError:
+            return False
+        return stat.st_size == object['Size'] and \
+            int(stat.st_mtime) == int(object['LastModified'].timestamp())
+
+    def download(source):
+        object, target = source
+
+        # downloads run concurrently; print each message
+        # (including its line break) in a single write
+        if sync and is_unchanged(object, target):
+            if verbose:
+                print('Skipping "{}" => "{}" (unchanged)\n'
+                      .format(object['Key'], target), end='')
+            return False
+
+        if verbose:
+            print('Downloading "{}" => "{}"\n'
+                  .format(object['Key'], target), end='')
+
+        target = cw.download_object(bucket,
+                                    object['Key'],
+                                    target,
+                                    resume=resume,
+                                    range_size=range_size,
+                                    range_jobs=range_jobs,
+                                    size=object['Size'],
+                                    etag=object['ETag'],
+                                    # progress dots of concurrent
+                                    # downloads would interleave
+                                    progress=jobs == 1)
+
+        if sync and not object['Key'].endswith('/'):
+            # use the object's modification time to identify
+            # unchanged files during subsequent downloads
+            timestamp = object['LastModified'].timestamp()
+            os.utime(target, (timestamp, timestamp))
+
+        return True
 
     # download objects matching the source specification
+    source_count = 0
     try:
-        object_count = 0
-
-        for object in objects:
-            # apply specification to object key
-            if not prog.match(object):
-                continue
-
-            target = str(Path(target_dir).joinpath(object))
-
-            if verbose:
-                print('Downloading "{}" => "{}"'.format(object, target))
-
-            cw.download_object(bucket, object, target)
-
-            object_count = object_count + 1
-
-        if object_count == 0:
+        # keep listing while objects are downloaded; buffer up to one
+        # listing page of objects that are waiting to be downloaded
+        object_count, failures = run_tasks(download,
+                                           list_sources(),
+                                           jobs,
+                                           queue_size=max(2 * jobs, 1000))
+
+        if failures:
+            # report (up to ten) failed downloads
+            details = ['"{}": {}'.format(source[0]['Key'], ex)
+                       for source, ex in failures[:10]]
+            raise DownloadError('Download of {} object(s) from bucket "{}" '
+                                'failed: {}'
+                                .format(len(failures),
+                                        bucket,
+                                        '; '.join(details)))
+
+        if source_count == 0:
             raise DownloadError('No objects in bucket "{}" match the '
                                 '"{}" specification.'
-                                .format(bucket, source_spec))
+                                .format(bucket, '", "'.join(specs)))
+
+        if verbose:
+            for spec in specs:
+                if spec not in hits:
+                    print('No objects in bucket "{}" match the '
+                          '"{}" specification.'.format(bucket, spec))
 
         # return number of downloaded files
         return object_count
@@ -157,11 +285,37 @@ def main():
     parser.add_argument('bucket',
                         help='Bucket name')
     parser.add_argument('pattern',
-                        help='Object key spec (supported wildcards: * and ?)')
+                        help='Object key spec (supported wildcards: '
+                             '*, **, ? and [...])',
+                        nargs='+')
     parser.add_argument('-d',
                         '--target_dir',
                         help='Local target directory. '
                              'Defaults to the current directory.')
+    parser.add_argument('-j',
+                        '--jobs',
+                        help='Maximum number of concurrent downloads. '
+                             'Defaults to 1.',
+                        type=int,
+                        default=1)
+    parser.add_argument('--sync',
+                        help='Skip objects that were already downloaded',
+                        action='store_true')
+    parser.add_argument('--resume',
+                        help='Continue interrupted downloads',
+                        action='store_true')
+    parser.add_argument('--range-size',
+                        help='Size in MB of byte ranges that are '
+                             'downloaded concurrently. Defaults to 64.',
+                        type=int)
+    parser.add_argument('--range-jobs',
+                        help='Maximum number of byte ranges of a large '
+                             'object that are downloaded concurrently. '
+                             'Defaults to 1.',
+                        type=int)
+    parser.add_argument('--warm-up',
+                        help='Open connections before the download starts',
+                        action='store_true')
 
     # parse command line parameters
     args = parser.parse_args()
@@ -175,14 +329,25 @@ def main():
               ' and AWS_SECRET_ACCESS_KEY must be set.')
         sys.exit(1)
 
+    range_size = None
+    if args.range_size:
+        range_size = args.range_size * 1024 * 1024
+
     try:
         # perform download
-        download_count = do_download(args.bucket,
-                                     args.pattern,
-                                     os.environ['AWS_ACCESS_KEY_ID'],
-                                     os.environ['AWS_SECRET_ACCESS_KEY'],
-                                     args.target_dir,
-                                     verbose=True)
+        download_count = call(do_download,
+                              args.bucket,
+                              args.pattern,
+                              os.environ['AWS_ACCESS_KEY_ID'],
+                              os.environ['AWS_SECRET_ACCESS_KEY'],
+                              args.target_dir,
+                              verbose=True,
+                              jobs=args.jobs,
+                              sync=args.sync,
+                              resume=args.resume,
+                              range_size=range_size,
+                              range_jobs=args.range_jobs,
+                              warm_up=args.warm_up)
 
         print('Downloaded {} object(s) from bucket "{}"'
               .format(download_count, args.bucket))
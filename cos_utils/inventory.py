@@ -0,0 +1,455 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+# An inventory stores the listing of a bucket in columns (numpy
+# arrays) instead of one Python object per object. Keys are stored
+# as concatenated UTF-8 bytes and offsets. Queries return boolean
+# masks, which can be combined using &, | and ~ and applied to the
+# aggregations or to filter.
+#
+# numpy is an optional dependency: pip install cos-utils[inventory]
+#
+
+import array
+import datetime
+import numbers
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# number of keys whose prefixes are compared at once by group_by_prefix
+GROUP_CHUNK_SIZE = 64*1024
+
+# storage class codes are stored as uint8
+MAX_STORAGE_CLASSES = 256
+
+
+class InventoryError(Exception):
+    pass
+
+
+def _require_numpy():
+    if np is None:
+        raise InventoryError('The inventory requires numpy. Run '
+                             '"pip install cos-utils[inventory]" to '
+                             'install it.')
+
+
+def build_inventory(bucket,
+                    access_key_id,
+                    secret_access_key,
+                    pattern=None,
+                    cos_wrapper=None):
+    """
+    Build an inventory of the objects in the specified bucket. Objects
+    are added to the inventory while the listing is in progress.
+
+    :param bucket: bucket name (must exist)
+    :type bucket: str
+    :param access_key_id: HMAC access key id
+    :type access_key_id: str
+    :param secret_access_key: HMAC secret access key
+    :type secret_access_key: str
+    :param pattern: object key pattern or list of patterns to be
+    applied, defaults to None (all objects)
+    :type pattern: str or list(str), optional
+    :param cos_wrapper: wrapper to be used instead of a (cached)
+    wrapper for the specified credentials, defaults to None
+    :type cos_wrapper: COSWrapper, optional
+    :raises ValueError: A required parameter value is missing.
+    :raises InventoryError: numpy is not installed or the listing
+    failed due to the specified reason.
+    :return: inventory
+    :rtype: Inventory
+    """
+
+    from .list_files import ListError, iter_list
+
+    _require_numpy()
+
+    try:
+        return Inventory.from_records(iter_list(bucket,
+                                                access_key_id,
+                                                secret_access_key,
+                                                pattern=pattern,
+                                                records=True,
+                                                cos_wrapper=cos_wrapper))
+    except ListError as le:
+        raise InventoryError(str(le))
+
+
+class Inventory:
+    """
+    Columnar listing of objects. The columns are numpy arrays:
+
+      key_data       uint8, UTF-8 encoded keys, concatenated
+      key_offsets    int64, offset of each key in key_data, followed
+                     by the length of key_data
+      sizes          int64, object sizes in bytes
+      mtimes         int64, modification times (seconds since epoch)
+      storage_class_codes
+                     uint8, index of the storage class of each
+                     object in storage_classes
+
+    storage_classes is a list of storage class names ('' if the
+    listing didn't include the storage class).
+    """
+
+    def __init__(self,
+                 key_data,
+                 key_offsets,
+                 sizes,
+                 mtimes,
+                 storage_class_codes,
+                 storage_classes):
+        _require_numpy()
+
+        if len(storage_classes) > MAX_STORAGE_CLASSES:
+            raise InventoryError('An inventory cannot contain more than '
+                                 '{} storage classes.'
+                                 .format(MAX_STORAGE_CLASSES))
+
+        self.key_data = key_data
+        self.key_offsets = key_offsets
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.storage_class_codes = storage_class_codes
+        self.storage_classes = list(storage_classes)
+
+    @classmethod
+    def from_records(cls,
+                     records):
+        """
+            Build an inventory from object records. Records are
+            consumed one at a time; the columns are accumulated in
+            compact buffers.
+
+            :param records: object records
+            :type records: iterable(ObjectRecord)
+
+            :rtype: Inventory
+
+            :raises InventoryError: the records use more than
+            MAX_STORAGE_CLASSES storage classes
+        """
+
+        _require_numpy()
+
+        key_data = bytearray()
+        key_offsets = array.array('q', [0])
+        sizes = array.array('q')
+        mtimes = array.array('q')
+        storage_class_codes = array.array('B')
+        storage_classes = {}
+
+        for record in records:
+            key_data.extend(record.key.encode('utf-8'))
+            key_offsets.append(len(key_data))
+            sizes.append(record.size)
+            mtimes.append(int(record.last_modified.timestamp()))
+            storage_class = record.storage_class or ''
+            if storage_class not in storage_classes:
+                if len(storage_classes) == MAX_STORAGE_CLASSES:
+                    raise InventoryError('The listing contains more than '
+                                         '{} storage classes.'
+                                         .format(MAX_STORAGE_CLASSES))
+                storage_classes[storage_class] = len(storage_classes)
+            storage_class_codes.append(storage_classes[storage_class])
+
+        return cls(np.frombuffer(key_data, dtype=np.uint8),
+                   np.frombuffer(key_offsets, dtype=np.int64),
+                   np.frombuffer(sizes, dtype=np.int64),
+                   np.frombuffer(mtimes, dtype=np.int64),
+                   np.frombuffer(storage_class_codes, dtype=np.uint8),
+                   sorted(storage_classes, key=storage_classes.get))
+
+    @classmethod
+    def load(cls,
+             file):
+        """
+            Load an inventory that was stored using save.
+
+            :param file: file name or file object
+            :type file: str or file
+
+            :rtype: Inventory
+
+            :raises InventoryError: the file is not an inventory
+        """
+
+        _require_numpy()
+
+        with np.load(file, allow_pickle=False) as data:
+            try:
+                return cls(data['key_data'],
+                           data['key_offsets'],
+                           data['sizes'],
+                           data['mtimes'],
+                           data['storage_class_codes'],
+                           [str(name) for name in data['storage_classes']])
+            except KeyError as ke:
+                raise InventoryError('The file is not an inventory: '
+                                     'column {} is missing'.format(ke))
+
+    def save(self,
+             file,
+             compressed=False):
+        """
+            Store the inventory in numpy's .npz format.
+
+            :param file: file name or file object
+            :type file: str or file
+
+            :param compressed: compress the columns; defaults to False
+            :type compressed: bool
+        """
+
+        savez = np.savez_compressed if compressed else np.savez
+        savez(file,
+              key_data=self.key_data,
+              key_offsets=self.key_offsets,
+              sizes=self.sizes,
+              mtimes=self.mtimes,
+              storage_class_codes=self.storage_class_codes,
+              storage_classes=np.array(self.storage_classes, dtype=str))
+
+    def __len__(self):
+        return len(self.sizes)
+
+    @property
+    def nbytes(self):
+        """
+            Memory used by the columns, in bytes.
+
+            :rtype: int
+        """
+
+        return sum(column.nbytes for column in (self.key_data,
+                                                self.key_offsets,
+                                                self.sizes,
+                                                self.mtimes,
+                                                self.storage_class_codes))
+
+    def key(self,
+            index):
+        """
+            Return the key of the object at index.
+
+            :param index: object index
+            :type index: int
+
+            :rtype: str
+        """
+
+        start, end = self.key_offsets[index], self.key_offsets[index + 1]
+        return self.key_data[start:end].tobytes().decode('utf-8')
+
+    def keys(self):
+        """
+            Iterate over the object keys.
+
+            :rtype: generator(str)
+        """
+
+        for index in range(len(self)):
+            yield self.key(index)
+
+    def prefix_mask(self,
+                    prefix):
+        """
+            Select the objects whose key starts with prefix.
+
+            :param prefix: key name prefix
+            :type prefix: str
+
+            :returns: boolean mask
+            :rtype: numpy.ndarray
+        """
+
+        prefix = np.frombuffer(prefix.encode('utf-8'), dtype=np.uint8)
+        starts = self.key_offsets[:-1]
+        mask = self.key_offsets[1:] - starts >= len(prefix)
+        # compare one character at a time for the remaining candidates
+        for position, character in enumerate(prefix):
+            candidates = np.flatnonzero(mask)
+            mask[candidates] = \
+                self.key_data[starts[candidates] + position] == character
+        return mask
+
+    def modified_before(self,
+                        time):
+        """
+            Select the objects that were last modified before time.
+
+            :param time: datetime (naive datetimes are local times),
+            seconds since epoch or age (timedelta)
+            :type time: datetime.datetime, numbers.Real or
+            datetime.timedelta
+
+            :returns: boolean mask
+            :rtype: numpy.ndarray
+        """
+
+        if isinstance(time, datetime.timedelta):
+            time = datetime.datetime.now(datetime.timezone.utc) - time
+        if isinstance(time, datetime.datetime):
+            time = time.timestamp()
+        if not isinstance(time, numbers.Real):
+            raise ValueError('Time "{}" is not supported'.format(time))
+        return self.mtimes < time
+
+    def storage_class_mask(self,
+                           storage_class):
+        """
+            Select the objects that are stored in storage_class.
+
+            :param storage_class: storage class name, e.g. STANDARD
+            :type storage_class: str
+
+            :returns: boolean mask
+            :rtype: numpy.ndarray
+        """
+
+        if storage_class not in self.storage_classes:
+            return np.zeros(len(self), dtype=bool)
+        return self.storage_class_codes == \
+            self.storage_classes.index(storage_class)
+
+    def filter(self,
+               mask):
+        """
+            Return a new inventory that contains the selected objects.
+
+            :param mask: boolean mask or object indices
+            :type mask: numpy.ndarray
+
+            :rtype: Inventory
+        """
+
+        indices = np.arange(len(self))[mask]
+        starts = self.key_offsets[indices]
+        lengths = self.key_offsets[indices + 1] - starts
+        key_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=key_offsets[1:])
+        # offset of each selected key byte in key_data
+        positions = np.arange(key_offsets[-1], dtype=np.int64) + \
+            np.repeat(starts - key_offsets[:-1], lengths)
+
+        return Inventory(self.key_data[positions],
+                         key_offsets,
+                         self.sizes[indices],
+                         self.mtimes[indices],
+                         self.storage_class_codes[indices],
+                         self.storage_classes)
+
+    def total_size(self,
+                   mask=None):
+        """
+            Return the total size of the (selected) objects in bytes.
+
+            :param mask: boolean mask; defaults to None (all objects)
+            :type mask: numpy.ndarray
+
+            :rtype: int
+        """
+
+        sizes = self.sizes if mask is None else self.sizes[mask]
+        return int(sizes.sum())
+
+    def group_by_prefix(self,
+                        depth=1,
+                        mask=None,
+                        delimiter='/'):
+        """
+            Return the number and total size of the (selected) objects
+            per key name prefix. The prefix of a key extends up to and
+            including its depth-th delimiter. Keys with fewer delimiters
+            are counted under the prefix that ends at their last
+            delimiter; keys without delimiter under ''.
+
+            :param depth: number of key name levels; defaults to 1
+            :type depth: int
+
+            :param mask: boolean mask; defaults to None (all objects)
+            :type mask: numpy.ndarray
+
+            :param delimiter: key name level delimiter; defaults to /
+            :type delimiter: str
+
+            :returns: (object count, total size) tuples, keyed by prefix
+            :rtype: dict
+        """
+
+        if depth < 1:
+            raise ValueError('Parameter "depth" must be at least 1')
+        delimiter = delimiter.encode('utf-8')
+        if len(delimiter) != 1:
+            raise ValueError('Parameter "delimiter" must be a single '
+                             'ASCII character')
+
+        indices = np.arange(len(self))
+        if mask is not None:
+            indices = indices[mask]
+        starts = self.key_offsets[indices]
+        ends = self.key_offsets[indices + 1]
+
+        # positions of the delimiters in key_data; the delimiters of
+        # a key are delimiters[first:last]
+        delimiters = np.flatnonzero(self.key_data == delimiter[0])
+        first = np.searchsorted(delimiters, starts)
+        last = np.searchsorted(delimiters, ends)
+        # index of the delimiter that ends the prefix of each key
+        level = np.minimum(first + depth, last) - 1
+        has_prefix = level >= first
+        lengths = np.zeros(len(indices), dtype=np.int64)
+        lengths[has_prefix] = delimiters[level[has_prefix]] + 1 - \
+            starts[has_prefix]
+
+        groups = {}
+        for chunk in range(0, len(indices), GROUP_CHUNK_SIZE):
+            selection = slice(chunk, chunk + GROUP_CHUNK_SIZE)
+            chunk_starts = starts[selection]
+            chunk_lengths = lengths[selection]
+            width = int(chunk_lengths.max())
+            if width == 0:
+                # no key in this chunk has a prefix
+                unique = [b'']
+                inverse = np.zeros(len(chunk_lengths), dtype=np.int64)
+            else:
+                # compare fixed width prefixes, padded with zero bytes
+                columns = np.arange(width)
+                positions = np.minimum(chunk_starts[:, None] + columns,
+                                       len(self.key_data) - 1)
+                matrix = np.where(columns < chunk_lengths[:, None],
+                                  self.key_data[positions],
+                                  np.uint8(0))
+                prefixes = matrix.view('S{}'.format(width)).ravel()
+                unique, inverse = np.unique(prefixes, return_inverse=True)
+                inverse = inverse.ravel()
+            counts = np.bincount(inverse, minlength=len(unique))
+            # sum sizes as integers; bincount's float64 weights are
+            # not exact for totals above 2**53 bytes
+            sizes = np.zeros(len(unique), dtype=np.int64)
+            np.add.at(sizes, inverse, self.sizes[indices[selection]])
+            for prefix, count, size in zip(unique, counts, sizes):
+                prefix = prefix.decode('utf-8')
+                total_count, total_size = groups.get(prefix, (0, 0))
+                groups[prefix] = (total_count + int(count),
+                                  total_size + int(size))
+        return groups
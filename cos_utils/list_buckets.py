@@ -23,10 +23,10 @@
 
 import argparse
 import os
-import re
 import sys
 
-from .cos import COSWrapper, COSWrapperError
+from .daemon import call
+from .patterns import compile_spec
 
 
 class ListError(Exception):
@@ -36,7 +36,8 @@ class ListError(Exception):
 def do_list(access_key_id,
             secret_access_key,
             pattern=None,
-            verbose=False):
+            verbose=False,
+            cos_wrapper=None):
     """
     List buckets in selected Cloud Object Storage instance.
 
@@ -48,22 +49,31 @@ def do_list(access_key_id,
     :type pattern: str, optional
     :param verbose: print output to console, defaults to False
     :type verbose: bool, optional
+    :param cos_wrapper: wrapper to be used instead of a (cached)
+    wrapper for the specified credentials, defaults to None
+    :type cos_wrapper: COSWrapper, optional
     :return: Objects in bucket matching the pattern
     :rtype: list
     :raises ValueError: A required parameter value is missing.
     :raises ListError: Listing failed due to the specified reason.
     """
 
-    if not access_key_id:
-        raise ValueError('Parameter "access_key_id" is required')
+    # the SDK is imported on demand to keep the startup time low
+    from .cos import COSWrapperError, get_cos_wrapper
 
-    if not secret_access_key:
-        raise ValueError('Parameter "secret_access_key" is required')
+    if cos_wrapper is None:
+        if not access_key_id:
+            raise ValueError('Parameter "access_key_id" is required')
+
+        if not secret_access_key:
+            raise ValueError('Parameter "secret_access_key" is required')
 
     try:
-        # instantiate Cloud Object Storage wrapper
-        cw = COSWrapper(access_key_id,
-                        secret_access_key)
+        # reuse the wrapper for these credentials, if one exists
+        cw = cos_wrapper or get_cos_wrapper(access_key_id,
+                                            secret_access_key)
+        # connectivity is only verified once per wrapper and bucket
+        cw.verify_connectivity()
     except COSWrapperError as cwe:
         raise ListError('Cannot access Cloud Object Storage: {}'
                         .format(cwe))
@@ -74,12 +84,8 @@ def do_list(access_key_id,
         if not pattern:
             return bucket_list
 
-        # sanitize bucket name pattern
-        pattern = pattern.replace('*', '.*')
-        pattern = pattern.replace('?', '.?')
-        pattern = '^{}$'.format(pattern)
-        # precompile pattern
-        prog = re.compile(pattern)
+        # precompile bucket name pattern
+        prog = compile_spec(pattern)
         return list(filter(prog.match, bucket_list))
 
     except Exception as ex:
@@ -99,7 +105,8 @@ def main():
                                      epilog=epilog_msg)
 
     parser.add_argument('pattern',
-                        help='Bucket name spec (supported wildcards: * and ?)')
+                        help='Bucket name spec '
+                             '(supported wildcards: *, ? and [...])')
 
     # parse command line parameters
     args = parser.parse_args()
@@ -115,10 +122,11 @@ def main():
 
     try:
         # fetch bucket list
-        bucket_list = do_list(os.environ['AWS_ACCESS_KEY_ID'],
-                              os.environ['AWS_SECRET_ACCESS_KEY'],
-                              args.pattern,
-                              verbose=True)
+        bucket_list = call(do_list,
+                           os.environ['AWS_ACCESS_KEY_ID'],
+                           os.environ['AWS_SECRET_ACCESS_KEY'],
+                           args.pattern,
+                           verbose=True)
 
         # display sorted bucket list
         if bucket_list:
@@ -22,11 +22,17 @@
 
 
 import argparse
+import csv
+import json
 import os
-import re
 import sys
 
-from .cos import COSWrapper, COSWrapperError
+from .daemon import call
+from .patterns import KeyMatcher
+from .records import ObjectRecord
+
+# output formats supported by the utility
+OUTPUT_FORMATS = ('text', 'jsonl', 'csv')
 
 
 class ListError(Exception):
@@ -37,7 +43,8 @@ def do_list(bucket,
             access_key_id,
             secret_access_key,
             pattern=None,
-            verbose=False):
+            verbose=False,
+            cos_wrapper=None):
     """
     List the content of the specified bucket.
 
@@ -47,53 +54,149 @@ def do_list(bucket,
     :type access_key_id: str
     :param secret_access_key: HMAC secret access key
     :type secret_access_key: str
-    :param pattern: object key pattern to be applied, defaults to None
-    :type pattern: str, optional
+    :param pattern: object key pattern or list of patterns to be
+    applied, defaults to None
+    :type pattern: str or list(str), optional
     :param verbose: [description], defaults to False
     :type verbose: bool, optional
+    :param cos_wrapper: wrapper to be used instead of a (cached)
+    wrapper for the specified credentials, defaults to None
+    :type cos_wrapper: COSWrapper, optional
     :return: Objects in bucket matching the pattern
     :rtype: list
     :raises ValueError: A required parameter value is missing.
     :raises ListError: Listing failed due to the specified reason.
     """
 
+    return list(iter_list(bucket,
+                          access_key_id,
+                          secret_access_key,
+                          pattern=pattern,
+                          verbose=verbose,
+                          cos_wrapper=cos_wrapper))
+
+
+def iter_list(bucket,
+              access_key_id,
+              secret_access_key,
+              pattern=None,
+              verbose=False,
+              records=False,
+              cos_wrapper=None):
+    """
+    Iterate over the content of the specified bucket. Unlike
+    do_list, object keys are returned while the listing is in
+    progress.
+
+    :param bucket: Source bucket name. (Must exist)
+    :type bucket: str
+    :param access_key_id: HMAC access key id
+    :type access_key_id: str
+    :param secret_access_key: HMAC secret access key
+    :type secret_access_key: str
+    :param pattern: object key pattern or list of patterns to be
+    applied, defaults to None
+    :type pattern: str or list(str), optional
+    :param verbose: [description], defaults to False
+    :type verbose: bool, optional
+    :param records: return ObjectRecord instances (key, size, ETag,
+    modification time and storage class) instead of object keys,
+    defaults to False
+    :type records: bool, optional
+    :param cos_wrapper: wrapper to be used instead of a (cached)
+    wrapper for the specified credentials, defaults to None
+    :type cos_wrapper: COSWrapper, optional
+    :return: Objects in bucket matching the pattern
+    :rtype: generator
+    :raises ValueError: A required parameter value is missing.
+    :raises ListError: Listing failed due to the specified reason.
+    """
+
+    # the SDK is imported on demand to keep the startup time low
+    from .cos import COSWrapperError, get_cos_wrapper
+
     if not bucket:
         raise ValueError('Parameter "bucket" is required')
 
-    if not access_key_id:
-        raise ValueError('Parameter "access_key_id" is required')
+    if cos_wrapper is None:
+        if not access_key_id:
+            raise ValueError('Parameter "access_key_id" is required')
 
-    if not secret_access_key:
-        raise ValueError('Parameter "secret_access_key" is required')
+        if not secret_access_key:
+            raise ValueError('Parameter "secret_access_key" is required')
 
     try:
-        # instantiate Cloud Object Storage wrapper
-        cw = COSWrapper(access_key_id,
-                        secret_access_key,
-                        connectivity_test_bucket=bucket)
+        # reuse the wrapper for these credentials, if one exists
+        cw = cos_wrapper or get_cos_wrapper(access_key_id,
+                                            secret_access_key)
+        # connectivity is only verified once per wrapper and bucket
+        cw.verify_connectivity(bucket)
     except COSWrapperError as cwe:
         raise ListError('Cannot access Cloud Object Storage: {}'
                         .format(cwe))
 
-    # fetch list of objects in the bucket
-    try:
-        object_list = cw.get_object_list(bucket)
-        if not pattern:
-            return object_list
-
-        # sanitize source specification
-        pattern = pattern.replace('.', '\\.')
-        pattern = pattern.replace('*', '.*')
-        pattern = pattern.replace('?', '.?')
-        pattern = '^{}$'.format(pattern)
-        # precompile pattern
-        prog = re.compile(pattern)
-        return list(filter(prog.match, object_list))
+    def list_objects():
+        # fetch list of objects in the bucket
+        try:
+            if not pattern:
+                if records:
+                    yield from cw.iter_object_records(bucket)
+                else:
+                    yield from cw.iter_objects(bucket)
+                return
+
+            # precompile patterns
+            matcher = KeyMatcher([pattern] if isinstance(pattern, str)
+                                 else pattern)
+
+            # limit the listing to keys that start with the
+            # literal part of a pattern
+            for prefix in matcher.prefixes():
+                for object in cw.iter_object_records(bucket, prefix):
+                    if matcher.matches(object.key):
+                        yield object if records else object.key
+
+        except Exception as ex:
+            # catch and mask exception
+            raise ListError('Listing of bucket "{}" failed: {}'
+                            .format(bucket, ex))
+
+    return list_objects()
 
-    except Exception as ex:
-        # catch and mask exception
-        raise ListError('Listing of bucket "{}" failed: {}'
-                        .format(bucket, ex))
+
+def write_records(records,
+                  stream,
+                  format='jsonl'):
+    """
+    Write object records to stream as they are produced.
+
+    :param records: object records
+    :type records: iterable(ObjectRecord)
+    :param stream: text stream
+    :type stream: io.TextIOBase
+    :param format: jsonl (one JSON object per line) or csv (with
+    header row), defaults to jsonl
+    :type format: str, optional
+    :return: number of written records
+    :rtype: int
+    """
+
+    if format not in OUTPUT_FORMATS[1:]:
+        raise ValueError('Format "{}" is not supported'.format(format))
+
+    count = 0
+    if format == 'csv':
+        writer = csv.writer(stream, lineterminator='\n')
+        writer.writerow(ObjectRecord.FIELDS)
+        for record in records:
+            values = record.to_dict()
+            writer.writerow([values[name] for name in ObjectRecord.FIELDS])
+            count = count + 1
+    else:
+        for record in records:
+            stream.write(json.dumps(record.to_dict()) + '\n')
+            count = count + 1
+    return count
 
 
 def main():
@@ -109,7 +212,17 @@ def main():
                         help='Bucket name')
 
     parser.add_argument('pattern',
-                        help='Object key spec (supported wildcards: * and ?)')
+                        help='Object key spec (supported wildcards: '
+                             '*, **, ? and [...])',
+                        nargs='+')
+    parser.add_argument('-f',
+                        '--format',
+                        help='Output format. text lists object keys; jsonl '
+                             'and csv list key, size, ETag, modification '
+                             'time and storage class of each object. '
+                             'Defaults to text.',
+                        choices=OUTPUT_FORMATS,
+                        default='text')
 
     # parse command line parameters
     args = parser.parse_args()
@@ -124,18 +237,29 @@ def main():
         sys.exit(1)
 
     try:
-        # perform listing
-        object_list = do_list(args.bucket,
-                              os.environ['AWS_ACCESS_KEY_ID'],
-                              os.environ['AWS_SECRET_ACCESS_KEY'],
-                              args.pattern,
-                              verbose=True)
-
-        for object in object_list:
+        # perform listing; display objects as they are listed
+        objects = call(iter_list,
+                       args.bucket,
+                       os.environ['AWS_ACCESS_KEY_ID'],
+                       os.environ['AWS_SECRET_ACCESS_KEY'],
+                       args.pattern,
+                       verbose=True,
+                       records=args.format != 'text')
+
+        if args.format != 'text':
+            # machine readable output doesn't include a summary
+            write_records(objects, sys.stdout, args.format)
+            return
+
+        object_count = 0
+        for object in objects:
             print(object)
+            object_count = object_count + 1
 
         print('Bucket "{}" contains {} object(s) matching "{}".'
-              .format(args.bucket, len(object_list), args.pattern))
+              .format(args.bucket,
+                      object_count,
+                      '", "'.join(args.pattern)))
     except Exception as ex:
         print('Error. {}'.format(ex))
         # exit with non-zero return code
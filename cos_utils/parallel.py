@@ -0,0 +1,116 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import functools
+import queue
+import threading
+
+try:
+    import contextvars
+except ImportError:
+    # Python 3.6
+    contextvars = None
+
+# marks the end of the task queue
+_STOP = object()
+
+
+def run_tasks(task,
+              items,
+              jobs=1,
+              queue_size=None):
+    """
+    Invoke task for every item in items using up to jobs worker
+    threads. Items are consumed by the calling thread while the
+    workers are busy and handed over through a bounded queue, which
+    blocks the calling thread (and therefore the production of items)
+    if the workers cannot keep up.
+
+    :param task: function to be invoked for each item
+    :type task: callable
+    :param items: items to be processed
+    :type items: iterable
+    :param jobs: maximum number of concurrently running tasks,
+    defaults to 1
+    :type jobs: int, optional
+    :param queue_size: maximum number of items that are waiting to
+    be processed, defaults to 2 * jobs
+    :type queue_size: int, optional
+    :return: number of items for which task returned a truthy value
+    and a list of (item, exception) tuples for items that failed
+    :rtype: tuple(int, list)
+    """
+
+    count = 0
+    failures = []
+
+    if jobs is None or jobs <= 1:
+        # process items in the calling thread
+        for item in items:
+            try:
+                if task(item):
+                    count = count + 1
+            except Exception as ex:
+                failures.append((item, ex))
+        return count, failures
+
+    tasks = queue.Queue(maxsize=queue_size or 2 * jobs)
+    lock = threading.Lock()
+
+    def work():
+        nonlocal count
+        while True:
+            item = tasks.get()
+            if item is _STOP:
+                return
+            try:
+                result = task(item)
+            except Exception as ex:
+                with lock:
+                    failures.append((item, ex))
+                continue
+            if result:
+                with lock:
+                    count = count + 1
+
+    workers = []
+    for _ in range(jobs):
+        target = work
+        if contextvars is not None:
+            # run tasks in a copy of the calling thread's context
+            target = functools.partial(contextvars.copy_context().run, work)
+        workers.append(threading.Thread(target=target, daemon=True))
+    for worker in workers:
+        worker.start()
+
+    try:
+        for item in items:
+            tasks.put(item)
+    except BaseException:
+        # discard items that were not yet picked up
+        try:
+            while True:
+                tasks.get_nowait()
+        except queue.Empty:
+            pass
+        raise
+    finally:
+        for _ in workers:
+            tasks.put(_STOP)
+        for worker in workers:
+            worker.join()
+
+    return count, failures
@@ -0,0 +1,276 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+# Object key specifications use the following wildcards:
+#
+#   *      any sequence of characters except /
+#   **     any sequence of characters, including /; **/ also
+#          matches no directory at all
+#   ?      any single character except /
+#   [...]  any single character (except /) in the set; [!...] or
+#          [^...] any single character (except /) not in the set
+#
+# A backslash turns the next character into a literal character.
+# All other characters (including regular expression metacharacters)
+# match themselves.
+#
+
+import re
+
+# characters that terminate the literal part of an object key spec
+SPECIAL_CHARACTERS = '*?[\\'
+
+
+def _find_set_end(spec, index):
+    """
+    Return the offset of the bracket that closes the set starting at
+    index (the offset following the opening bracket) or -1
+    """
+
+    if index < len(spec) and spec[index] in '!^':
+        index = index + 1
+    if index < len(spec) and spec[index] == ']':
+        # ] is a member of the set if it comes first
+        index = index + 1
+    return spec.find(']', index)
+
+
+def _split(spec):
+    """
+    Split an object key specification into its literal prefix (with
+    escape characters removed) and the offset of the remainder
+    """
+
+    prefix = []
+    index = 0
+    while index < len(spec):
+        character = spec[index]
+        if character not in SPECIAL_CHARACTERS:
+            prefix.append(character)
+        elif character == '\\' and index + 1 < len(spec):
+            index = index + 1
+            prefix.append(spec[index])
+        elif character == '[' and _find_set_end(spec, index + 1) < 0:
+            # no closing bracket; [ is a literal character
+            prefix.append(character)
+        else:
+            break
+        index = index + 1
+    return ''.join(prefix), index
+
+
+def _translate(spec, index=0):
+    """
+    Translate an object key specification, starting at index, into
+    a regular expression (without anchors)
+    """
+
+    parts = []
+    length = len(spec)
+    while index < length:
+        character = spec[index]
+        index = index + 1
+        if character == '*':
+            if spec.startswith('*', index):
+                index = index + 1
+                if spec.startswith('/', index) and \
+                   (index == 2 or spec[index - 3] == '/'):
+                    # **/ matches zero or more directories
+                    index = index + 1
+                    parts.append('(?:.*/)?')
+                else:
+                    parts.append('.*')
+            else:
+                parts.append('[^/]*')
+        elif character == '?':
+            parts.append('[^/]')
+        elif character == '[':
+            end = _find_set_end(spec, index)
+            if end < 0:
+                # no closing bracket; [ is a literal character
+                parts.append(re.escape(character))
+                continue
+            members = spec[index:end]
+            index = end + 1
+            negate = members[:1] in ('!', '^')
+            if negate:
+                members = members[1:]
+            # keep ranges; escape all other characters
+            members = ''.join('-' if member == '-' and
+                              0 < position < len(members) - 1
+                              else re.escape(member)
+                              for position, member in enumerate(members))
+            # sets never match /
+            parts.append('(?!/)[{}{}]'.format('^' if negate else '',
+                                              members))
+        elif character == '\\' and index < length:
+            parts.append(re.escape(spec[index]))
+            index = index + 1
+        else:
+            parts.append(re.escape(character))
+    return ''.join(parts)
+
+
+def _compile(spec, index=0):
+    """
+    Compile the remainder of an object key specification, starting at
+    index, into a regular expression that matches complete keys
+    """
+
+    try:
+        return re.compile('(?s){}\\Z'.format(_translate(spec, index)))
+    except re.error as ex:
+        # e.g. a set with an invalid range, such as [z-a]
+        raise ValueError('Invalid object key specification "{}": {}'
+                         .format(spec, ex))
+
+
+def compile_spec(spec):
+    """
+    Compile an object key specification into a regular expression.
+
+    :param spec: object key specification (supported wildcards:
+    *, **, ? and [...])
+    :type spec: str
+    :return: compiled regular expression, which matches complete keys
+    :rtype: re.Pattern
+    :raises ValueError: the specification is invalid
+    """
+
+    return _compile(spec)
+
+
+def literal_prefix(spec):
+    """
+    Return the longest wildcard-free prefix of an object key
+    specification. Every key that matches the specification starts
+    with this prefix, which therefore can be used to narrow down
+    object listings on the server.
+
+    :param spec: object key specification (supported wildcards:
+    *, **, ? and [...])
+    :type spec: str
+    :return: literal key name prefix, which might be empty
+    :rtype: str
+    """
+
+    if not spec:
+        return ''
+
+    return _split(spec)[0]
+
+
+class KeyMatcher:
+    """
+    Matches object keys against multiple object key specifications at
+    once. The literal prefixes of the specifications are stored in a
+    trie; a key is checked against the remainder of a specification
+    only if it starts with the specification's literal prefix.
+    """
+
+    def __init__(self,
+                 specs):
+        """
+            :param specs: object key specifications
+            :type specs: list(str)
+
+            :raises ValueError: a specification is invalid
+        """
+
+        self.specs = list(specs)
+        # maps characters to child nodes; key None maps to
+        # the specifications whose literal prefix ends here
+        self._root = {}
+        self._prefixes = set()
+        for number, spec in enumerate(self.specs):
+            prefix, index = _split(spec)
+            self._prefixes.add(prefix)
+            # the prefix was matched already; match the remainder
+            # starting at the end of the prefix
+            prog = _compile(spec, index)
+            node = self._root
+            for character in prefix:
+                node = node.setdefault(character, {})
+            node.setdefault(None, []).append((number, prog))
+
+    def match(self,
+              key):
+        """
+            Return the specifications that key matches.
+
+            :param key: object key
+            :type key: str
+
+            :returns: matching specifications, in the order in which
+            they were passed to the constructor
+            :rtype: list(str)
+        """
+
+        numbers = []
+        node = self._root
+        position = 0
+        while node is not None:
+            for number, prog in node.get(None, ()):
+                if prog.match(key, position):
+                    numbers.append(number)
+            if position == len(key):
+                break
+            node = node.get(key[position])
+            position = position + 1
+        return [self.specs[number] for number in sorted(numbers)]
+
+    def matches(self,
+                key):
+        """
+            Return True if key matches at least one specification.
+
+            :param key: object key
+            :type key: str
+
+            :rtype: bool
+        """
+
+        node = self._root
+        position = 0
+        while node is not None:
+            for _, prog in node.get(None, ()):
+                if prog.match(key, position):
+                    return True
+            if position == len(key):
+                break
+            node = node.get(key[position])
+            position = position + 1
+        return False
+
+    def prefixes(self):
+        """
+            Return the key name prefixes that need to be listed to find
+            all keys that match at least one specification. No prefix
+            is a prefix of another one; each key is therefore listed
+            at most once.
+
+            :returns: sorted list of key name prefixes
+            :rtype: list(str)
+        """
+
+        prefixes = []
+        for prefix in sorted(self._prefixes):
+            if prefixes and prefix.startswith(prefixes[-1]):
+                # covered by a shorter prefix
+                continue
+            prefixes.append(prefix)
+        return prefixes
@@ -0,0 +1,135 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import datetime
+
+
+class ObjectRecord:
+    """
+    Metadata of an object, as returned by an object listing. Records
+    don't have a __dict__, which keeps the memory footprint of large
+    listings low.
+    """
+
+    # names of the record fields, in output order
+    FIELDS = ('key', 'size', 'etag', 'last_modified', 'storage_class')
+
+    __slots__ = FIELDS
+
+    def __init__(self,
+                 key,
+                 size,
+                 etag,
+                 last_modified,
+                 storage_class=None):
+        """
+            :param key: object key
+            :type key: str
+
+            :param size: object size in bytes
+            :type size: int
+
+            :param etag: ETag of the object, without quotes
+            :type etag: str
+
+            :param last_modified: modification time of the object
+            :type last_modified: datetime.datetime
+
+            :param storage_class: storage class of the object,
+            defaults to None
+            :type storage_class: str, optional
+        """
+
+        self.key = key
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.storage_class = storage_class
+
+    @classmethod
+    def from_listing(cls,
+                     entry):
+        """
+            Create a record from an entry of the 'Contents' list of a
+            ListObjectsV2 response.
+
+            :param entry: listing entry
+            :type entry: dict
+
+            :rtype: ObjectRecord
+        """
+
+        return cls(entry['Key'],
+                   entry['Size'],
+                   entry['ETag'].strip('"'),
+                   entry['LastModified'],
+                   entry.get('StorageClass'))
+
+    def to_tuple(self):
+        """
+            Return the field values, in FIELDS order.
+
+            :rtype: tuple
+        """
+
+        return (self.key,
+                self.size,
+                self.etag,
+                self.last_modified,
+                self.storage_class)
+
+    def to_dict(self):
+        """
+            Return the fields as a JSON serializable dict. The
+            modification time is formatted as ISO 8601 string.
+
+            :rtype: dict
+        """
+
+        values = dict(zip(self.FIELDS, self.to_tuple()))
+        values['last_modified'] = self.last_modified.isoformat()
+        return values
+
+    def __eq__(self, other):
+        if not isinstance(other, ObjectRecord):
+            return NotImplemented
+        return self.to_tuple() == other.to_tuple()
+
+    def __repr__(self):
+        return 'ObjectRecord({})'.format(
+            ', '.join('{}={!r}'.format(name, value)
+                      for name, value in zip(self.FIELDS, self.to_tuple())))
+
+
+def encode_record(record):
+    """
+    Encode record as JSON serializable list (used by the daemon).
+    """
+
+    values = list(record.to_tuple())
+    values[3] = values[3].timestamp()
+    return values
+
+
+def decode_record(values):
+    """
+    Create a record from a list that was returned by encode_record.
+    """
+
+    values = list(values)
+    values[3] = datetime.datetime.fromtimestamp(values[3],
+                                                datetime.timezone.utc)
+    return ObjectRecord(*values)
@@ -25,7 +25,8 @@ import argparse
 import os
 import sys
 
-from .cos import COSWrapper, COSWrapperError
+from .daemon import call
+from .patterns import KeyMatcher
 
 
 class RemoveError(Exception):
@@ -35,10 +36,14 @@ class RemoveError(Exception):
 def do_remove(bucket,
               access_key_id,
               secret_access_key,
-              object_spec='*',
-              verbose=False):
+              object_spec='**',
+              verbose=False,
+              dry_run=False,
+              jobs=4,
+              cos_wrapper=None):
     """
-    Clear content of the specified bucket.
+    Remove the objects identified by object_spec from the
+    specified bucket.
 
     :param bucket: Source bucket name. (Must exist)
     :type bucket: str
@@ -47,39 +52,105 @@ def do_remove(bucket,
     :param secret_access_key: HMAC secret access key
     :type secret_access_key: str
 
-    :param object_spec: [description], defaults to '*'
-    :type object_spec: str, optional
-    :param verbose: [description], defaults to False
+    :param object_spec: Identifies the objects to be removed; pass
+    a list to remove the objects that match any of several
+    specifications, defaults to '**' (all objects)
+    :type object_spec: str or list(str), optional
+    :param verbose: print diagnostic information, defaults to False
     :type verbose: bool, optional
+    :param dry_run: identify the objects to be removed but don't
+    remove them, defaults to False
+    :type dry_run: bool, optional
+    :param jobs: maximum number of concurrent delete requests,
+    defaults to 4
+    :type jobs: int, optional
+    :param cos_wrapper: wrapper to be used instead of a (cached)
+    wrapper for the specified credentials, defaults to None
+    :type cos_wrapper: COSWrapper, optional
 
     :raises ValueError: A required parameter value is missing.
     :raises RemoveError: Object removal failed due to the specified reason.
 
-    :return: Number of removed objects
+    :return: Number of removed objects (or, if dry_run is set, the
+    number of objects that would be removed)
     :rtype: int
     """
 
+    # the SDK is imported on demand to keep the startup time low
+    from .cos import COSWrapperError, get_cos_wrapper
+
     if not bucket:
         raise ValueError('Parameter "bucket" is required')
 
-    if not access_key_id:
-        raise ValueError('Parameter "access_key_id" is required')
+    if cos_wrapper is None:
+        if not access_key_id:
+            raise ValueError('Parameter "access_key_id" is required')
+
+        if not secret_access_key:
+            raise ValueError('Parameter "secret_access_key" is required')
 
-    if not secret_access_key:
-        raise ValueError('Parameter "secret_access_key" is required')
+    if not object_spec:
+        object_spec = '**'
 
     try:
-        # instantiate Cloud Object Storage wrapper
-        cw = COSWrapper(access_key_id,
-                        secret_access_key,
-                        connectivity_test_bucket=bucket)
+        # reuse the wrapper for these credentials, if one exists;
+        # its connection pool must accommodate all concurrent requests
+        cw = cos_wrapper or \
+            get_cos_wrapper(access_key_id,
+                            secret_access_key,
+                            max_pool_connections=jobs)
+        # connectivity is only verified once per wrapper and bucket
+        cw.verify_connectivity(bucket)
     except COSWrapperError as cwe:
         raise RemoveError('Cannot access Cloud Object Storage: {}'
                           .format(cwe))
 
-    # fetch list of objects in the bucket
+    # precompile object specifications
+    specs = [object_spec] if isinstance(object_spec, str) \
+        else list(object_spec)
+    try:
+        matcher = KeyMatcher(specs)
+    except ValueError as ve:
+        raise RemoveError(ve)
+    total_bytes = 0
+
+    def list_objects():
+        """
+        Yield the keys of objects that match the object specification
+        """
+        nonlocal total_bytes
+        # limit the listing to keys that start with the
+        # literal part of an object specification
+        for prefix in matcher.prefixes():
+            for page in cw.iter_object_pages(bucket, prefix):
+                for object in page:
+                    if not matcher.matches(object['Key']):
+                        continue
+
+                    total_bytes = total_bytes + object.get('Size', 0)
+
+                    if verbose:
+                        if dry_run:
+                            print(object['Key'])
+                        else:
+                            print('Removing "{}"'.format(object['Key']))
+
+                    yield object['Key']
+
+    # remove objects while they are being listed
     try:
-        return cw.clear_bucket(bucket)
+        if dry_run:
+            object_count = sum(1 for _ in list_objects())
+            if verbose:
+                print('Bucket "{}" contains {} object(s) ({} bytes) '
+                      'matching "{}".'
+                      .format(bucket, object_count,
+                              total_bytes, '", "'.join(specs)))
+            return object_count
+
+        return cw.delete_objects(bucket,
+                                 list_objects(),
+                                 jobs=jobs)
     except Exception as ex:
         # catch and mask exception
         raise RemoveError('Cleaning of bucket "{}" failed: {}'
@@ -98,10 +169,23 @@ def main():
     parser.add_argument('bucket',
                         help='Bucket name')
 
-    # parser.add_argument('-p',
-    #                     '--pattern',
-    #                     help='Object specification '
-    #                          '(supported wildcards: * and ?)')
+    parser.add_argument('-p',
+                        '--pattern',
+                        help='Object key spec (supported wildcards: '
+                             '*, **, ? and [...]). Can be specified '
+                             'multiple times. Defaults to all objects.',
+                        action='append')
+    parser.add_argument('-n',
+                        '--dry-run',
+                        help='List the objects that would be removed '
+                             'without removing them',
+                        action='store_true')
+    parser.add_argument('-j',
+                        '--jobs',
+                        help='Maximum number of concurrent delete requests. '
+                             'Defaults to 4.',
+                        type=int,
+                        default=4)
 
     # parse command line parameters
     args = parser.parse_args()
@@ -116,14 +200,21 @@ def main():
         sys.exit(1)
 
     try:
-        # perform listing
-        object_count = do_remove(args.bucket,
-                                 os.environ['AWS_ACCESS_KEY_ID'],
-                                 os.environ['AWS_SECRET_ACCESS_KEY'],
-                                 verbose=True)
-
-        print('Removed {} object(s) from bucket "{}".'
-              .format(object_count, args.bucket))
+        # perform removal
+        object_count = call(do_remove,
+                            args.bucket,
+                            os.environ['AWS_ACCESS_KEY_ID'],
+                            os.environ['AWS_SECRET_ACCESS_KEY'],
+                            args.pattern,
+                            verbose=True,
+                            dry_run=args.dry_run,
+                            jobs=args.jobs)
+
+        if args.dry_run:
+            print('Dry run. No objects were removed.')
+        else:
+            print('Removed {} object(s) from bucket "{}".'
+                  .format(object_count, args.bucket))
     except Exception as ex:
         print('Error. {}'.format(ex))
         # exit with non-zero return code
@@ -22,19 +22,68 @@
 
 
 import argparse
+import fnmatch
 import glob
+import hashlib
+import json
 import os
+import stat
 import sys
 
-from pathlib import Path
+from .daemon import call
+from .parallel import run_tasks
+from .walker import WALK_JOBS, PathFilter, read_ignore_file, walk_files
 
-from .cos import COSWrapper, COSWrapperError
+
+# location of multipart upload journals (resumable uploads)
+JOURNAL_DIR = os.path.join(os.path.expanduser('~'), '.cos_utils', 'journal')
+
+# location of sync manifests, which record the size, modification time
+# and ETag of files that were uploaded or found to be unchanged
+MANIFEST_DIR = os.path.join(os.path.expanduser('~'),
+                            '.cos_utils',
+                            'manifest')
 
 
 class UploadError(Exception):
     pass
 
 
+def _manifest_file(bucket):
+    return os.path.join(MANIFEST_DIR,
+                        '{}.json'.format(hashlib.sha1(bucket.encode('utf-8'))
+                                         .hexdigest()))
+
+
+def _load_manifest(bucket):
+    """
+    Return the sync manifest for bucket, which maps object keys to
+    [file, size, mtime, ETag] lists
+    """
+    try:
+        with open(_manifest_file(bucket), 'r') as data:
+            manifest = json.load(data)
+        if isinstance(manifest, dict):
+            return manifest
+    except (OSError, ValueError):
+        # the manifest is a cache; start over
+        pass
+    return {}
+
+
+def _save_manifest(bucket, manifest):
+    file = _manifest_file(bucket)
+    try:
+        os.makedirs(MANIFEST_DIR, exist_ok=True)
+        # replace the manifest atomically
+        with open('{}.tmp'.format(file), 'w') as data:
+            json.dump(manifest, data)
+        os.replace('{}.tmp'.format(file), file)
+    except OSError:
+        # the next sync verifies more files
+        pass
+
+
 def do_upload(bucket,
               pattern,
               access_key_id,
@@ -43,7 +92,18 @@ def do_upload(bucket,
               wipe=False,
               squash=False,
               recursive=False,
-              verbose=False):
+              verbose=False,
+              jobs=1,
+              sync=False,
+              part_size=None,
+              part_jobs=None,
+              resume=False,
+              warm_up=False,
+              walk_jobs=WALK_JOBS,
+              include=None,
+              exclude=None,
+              ignore_file=None,
+              cos_wrapper=None):
     """
     Uploads the file(s) identified by pattern to
     the specified Cloud Object Storage bucket.
@@ -71,29 +131,95 @@ def do_upload(bucket,
     :type recursive: bool, optional
     :param verbose: print diagnostic information, defaults to False
     :type verbose: bool, optional
+    :param jobs: maximum number of concurrent uploads, defaults to 1
+    :type jobs: int, optional
+    :param sync: skip files that are identical to an existing object
+    with the same key; files whose size and modification time match
+    the manifest in MANIFEST_DIR are not read, defaults to False
+    :type sync: bool, optional
+    :param part_size: part size in bytes for multipart uploads,
+    defaults to None (derived from the file size)
+    :type part_size: int, optional
+    :param part_jobs: maximum number of concurrent part uploads
+    per file, defaults to None (up to 10)
+    :type part_jobs: int, optional
+    :param resume: record the progress of multipart uploads in
+    JOURNAL_DIR and resume interrupted uploads, defaults to False
+    :type resume: bool, optional
+    :param warm_up: open connections to the service before the
+    upload starts, defaults to False
+    :type warm_up: bool, optional
+    :param walk_jobs: maximum number of local directories that are
+    read concurrently if recursive is set, defaults to 8
+    :type walk_jobs: int, optional
+    :param include: if specified, only upload files whose name or
+    relative path matches one of these patterns, defaults to None
+    :type include: list(str), optional
+    :param exclude: skip files and directories whose name or relative
+    path matches one of these patterns; excluded directories are not
+    read, defaults to None
+    :type exclude: list(str), optional
+    :param ignore_file: file that contains additional exclude patterns,
+    one per line, defaults to None
+    :type ignore_file: str, optional
+    :param cos_wrapper: wrapper to be used instead of a (cached)
+    wrapper for the specified credentials, defaults to None
+    :type cos_wrapper: COSWrapper, optional
     :raises ValueError: A required parameter value is missing.
     :raises UploadError: Upload failed due to the specified reason.
-    :return: Number of uploaded objects
+    :return: Number of uploaded objects (excluding unchanged
+    files that were skipped in sync mode)
     :rtype: int
     """
 
+    # the SDK is imported on demand to keep the startup time low
+    from .cos import COSWrapper, COSWrapperError, get_cos_wrapper, \
+        compute_etag
+
     if not bucket:
         raise ValueError('Parameter "bucket" is required')
 
     if not pattern:
         raise ValueError('Parameter "pattern" is required')
 
-    if not access_key_id:
-        raise ValueError('Parameter "access_key_id" is required')
+    if cos_wrapper is None:
+        if not access_key_id:
+            raise ValueError('Parameter "access_key_id" is required')
+
+        if not secret_access_key:
+            raise ValueError('Parameter "secret_access_key" is required')
+
+    exclude = list(exclude or [])
+    if ignore_file:
+        try:
+            exclude.extend(read_ignore_file(ignore_file))
+        except OSError as ex:
+            raise UploadError('Cannot read ignore file "{}": {}'
+                              .format(ignore_file, ex))
+
+    # include and exclude patterns are applied during the walk
+    path_filter = None
+    if include or exclude:
+        try:
+            path_filter = PathFilter(include, exclude)
+        except ValueError as ve:
+            raise UploadError(ve)
 
-    if not secret_access_key:
-        raise ValueError('Parameter "secret_access_key" is required')
+    max_pool_connections = max(jobs or 1, 1) * \
+        (part_jobs or COSWrapper.MULTIPART_CONCURRENCY)
 
     try:
-        # instantiate Cloud Object Storage wrapper
-        cw = COSWrapper(access_key_id,
-                        secret_access_key,
-                        connectivity_test_bucket=bucket)
+        # reuse the wrapper for these credentials, if one exists;
+        # its connection pool must accommodate all concurrent requests
+        cw = cos_wrapper or \
+            get_cos_wrapper(access_key_id,
+                            secret_access_key,
+                            max_pool_connections=max_pool_connections)
+        # connectivity is only verified once per wrapper and bucket
+        cw.verify_connectivity(bucket)
+        if warm_up:
+            # open connections before the first transfer starts
+            cw.warm_up(bucket, max_pool_connections)
     except COSWrapperError as cwe:
         raise UploadError('Cannot access Cloud Object Storage: {}'
                           .format(cwe))
@@ -108,97 +234,222 @@ def do_upload(bucket,
         raise UploadError('Clearing of bucket "{}" failed: {}'
                           .format(bucket, ex))
 
-    # upload files matching the source specification
-    try:
-        file_count = 0
-
-        if os.path.isdir(pattern):
+    # size and ETag of existing objects; only used in sync mode
+    existing = {}
+    # files that are known to match an ETag; only used in sync mode
+    manifest = _load_manifest(bucket) if sync else {}
 
-            # source specification identifies a directory
-            base_dir = os.path.abspath(pattern)
-
-            if recursive:
-                source_pattern = '**/*'
+    try:
+        if sync and not wipe:
+            # fetch list of objects that might be replaced by the upload
+            if prefix:
+                key_name_prefix = '{}/'.format(prefix.rstrip('/'))
             else:
-                source_pattern = '*'
-
-            for file in Path(base_dir).glob(source_pattern):
-                file = str(file)
-
-                if not os.path.isfile(file):
-                    # can only upload files
-                    continue
-
-                if squash:
-                    # remove directory offset information
-                    key = os.path.basename(file[len(base_dir):])
-                else:
-                    key = file[len(base_dir)+1:]
-
-                # always use forward slashes in object keys
-                key = key.replace(os.path.sep, '/')
-
-                if prefix:
-                    # add key name prefix
-                    key = '{}/{}'.format(prefix.rstrip('/'), key)
-
-                if verbose:
-                    print('Uploading "{}" => "{}"'.format(file, key))
-
-                # upload object to Cloud Object Storage
-                cw.upload_object(file,
-                                 bucket,
-                                 key)
-
-                file_count = file_count + 1
-
-            if file_count == 0:
-                raise UploadError('The directory "{}" does not contain '
-                                  'any files.'
-                                  .format(pattern))
-
-            return file_count
-
-        # source specification likely identifies one or more files
-        base_dir = os.path.dirname(pattern)
-        if recursive:
-            file_pattern = '{}/**/{}'.format(base_dir,
-                                             os.path.basename(pattern))
-        else:
-            file_pattern = pattern
+                key_name_prefix = ''
+            for page in cw.iter_object_pages(bucket, key_name_prefix):
+                for object in page:
+                    existing[object['Key']] = (object['Size'],
+                                               object['ETag'].strip('"'))
+    except Exception as ex:
+        raise UploadError('Listing of bucket "{}" failed: {}'
+                          .format(bucket, ex))
 
-        for file in glob.iglob(file_pattern,
-                               recursive=recursive):
-            if not os.path.isfile(file):
-                # can only upload files
+    def is_unchanged(file, key, file_size, file_mtime):
+        """
+        Returns True if an object with the same size and ETag as file
+        is stored under key. The file is only read if it was modified
+        since its ETag was last recorded in the manifest.
+        """
+        if key not in existing:
+            return False
+        size, etag = existing[key]
+        if size != file_size:
+            return False
+        entry = [os.path.abspath(file), file_size, file_mtime, etag]
+        if manifest.get(key) == entry:
+            return True
+        if etag != compute_etag(file,
+                                cw.MULTIPART_THRESHOLD,
+                                cw.get_part_size(size, part_size)):
+            return False
+        manifest[key] = entry
+        return True
+
+    def relative_path(file, base_dir):
+        """
+        Return the path of file relative to base_dir, using / as
+        separator
+        """
+        if base_dir:
+            file = file[len(base_dir)+1:]
+        # otherwise the pattern identifies files in the current directory
+        return file.replace(os.path.sep, '/')
+
+    def object_key(file, base_dir):
+        """
+        Derive the object key for file
+        """
+        key = relative_path(file, base_dir)
+        if squash:
+            # remove directory offset information
+            key = key.rsplit('/', 1)[-1]
+
+        if prefix:
+            # add key name prefix
+            key = '{}/{}'.format(prefix.rstrip('/'), key)
+
+        return key
+
+    def stat_files(paths):
+        """
+        Yield (file, size, mtime) tuples for the paths that
+        identify files
+        """
+        for path in paths:
+            try:
+                info = os.stat(path)
+            except OSError:
                 continue
-
-            if squash:
-                # remove directory offset information
-                key = os.path.basename(file[len(base_dir):])
-            else:
-                key = file[len(base_dir)+1:]
-
-            # always use forward slashes in object keys
-            key = key.replace(os.path.sep, '/')
-
-            if prefix:
-                # add key name prefix
-                key = '{}/{}'.format(prefix.rstrip('/'), key)
-
+            if stat.S_ISREG(info.st_mode):
+                # can only upload files
+                yield path, info.st_size, info.st_mtime
+
+    def filter_files(files, base_dir):
+        """
+        Apply the include and exclude patterns to files that
+        were not found by walk_files
+        """
+        if path_filter is None:
+            yield from files
+            return
+        for file in files:
+            if path_filter.includes_path(relative_path(file[0], base_dir)):
+                yield file
+
+    def list_sources(files, base_dir):
+        """
+        Yield (file, key, size, mtime) tuples for the files to be
+        uploaded
+        """
+        nonlocal source_count
+        for file, size, mtime in files:
+            source_count = source_count + 1
+
+            yield file, object_key(file, base_dir), size, mtime
+
+    def upload(source):
+        file, key, size, mtime = source
+
+        # uploads run concurrently; print each message
+        # (including its line break) in a single write
+        if sync and is_unchanged(file, key, size, mtime):
             if verbose:
-                print('Uploading "{}" => "{}"'.format(file, key))
+                print('Skipping "{}" => "{}" (unchanged)\n'
+                      .format(file, key), end='')
+            return False
+
+        if verbose:
+            print('Uploading "{}" => "{}"\n'.format(file, key), end='')
+
+        # upload object to Cloud Object Storage
+        etag = cw.upload_object(file,
+                                bucket,
+                                key,
+                                part_size=part_size,
+                                part_jobs=part_jobs,
+                                journal_dir=JOURNAL_DIR if resume else None)
+        if sync:
+            # the next sync doesn't need to read the file
+            manifest[key] = [os.path.abspath(file), size, mtime, etag]
+        return True
 
-            # upload object to Cloud Object Storage
-            cw.upload_object(file,
-                             bucket,
-                             key)
+    # upload files matching the source specification
+    source_count = 0
+    try:
+        if os.path.isdir(pattern):
 
-            file_count = file_count + 1
+            # source specification identifies a directory; include
+            # hidden files but don't follow links to directories
+            base_dir = os.path.abspath(pattern)
 
-        if file_count == 0:
-            raise UploadError('No files match the pattern "{}"'
-                              .format(pattern))
+            match = descend = None
+            if path_filter is not None:
+                # excluded directories are not read
+                match = path_filter.includes_file
+                descend = path_filter.includes_directory
+
+            files = walk_files(base_dir,
+                               recursive=recursive,
+                               match=match,
+                               descend=descend,
+                               jobs=walk_jobs)
+            empty_msg = 'The directory "{}" does not contain any files.'
+        else:
+            # source specification likely identifies one or more files
+            base_dir = os.path.dirname(pattern)
+            name_pattern = os.path.basename(pattern)
+
+            def match(relative):
+                # like glob, only match hidden files if the
+                # pattern starts with a dot
+                name = relative.rsplit('/', 1)[-1]
+                if name.startswith('.') and \
+                   not name_pattern.startswith('.'):
+                    return False
+                if not fnmatch.fnmatch(name, name_pattern):
+                    return False
+                return path_filter is None or \
+                    path_filter.includes_file(relative)
+
+            def descend(name):
+                # like glob, skip hidden directories
+                if name.rsplit('/', 1)[-1].startswith('.'):
+                    return False
+                return path_filter is None or \
+                    path_filter.includes_directory(name)
+
+            if glob.has_magic(base_dir):
+                # wildcards in directory names are resolved by glob
+                if recursive:
+                    file_pattern = os.path.join(base_dir,
+                                                '**',
+                                                name_pattern)
+                else:
+                    file_pattern = pattern
+                files = filter_files(stat_files(
+                    glob.iglob(file_pattern, recursive=recursive)),
+                    base_dir)
+            elif not recursive and not glob.has_magic(name_pattern):
+                # the pattern identifies a single file
+                files = filter_files(stat_files([pattern]), base_dir)
+            else:
+                files = walk_files(base_dir,
+                                   recursive=recursive,
+                                   match=match,
+                                   descend=descend,
+                                   follow_symlinks=True,
+                                   jobs=walk_jobs)
+            empty_msg = 'No files match the pattern "{}"'
+
+        # files are uploaded while the walk is in progress
+        sources = list_sources(files, base_dir)
+
+        file_count, failures = run_tasks(upload, sources, jobs)
+
+        if sync:
+            _save_manifest(bucket, manifest)
+
+        if failures:
+            # report (up to ten) failed uploads
+            details = ['"{}": {}'.format(source[0], ex)
+                       for source, ex in failures[:10]]
+            raise UploadError('Upload of {} file(s) to bucket "{}" failed: {}'
+                              .format(len(failures),
+                                      bucket,
+                                      '; '.join(details)))
+
+        if source_count == 0:
+            raise UploadError(empty_msg.format(pattern))
 
         # return number of uploaded files
         return file_count
@@ -241,6 +492,51 @@ def main():
                         '--wipe',
                         help='Clear bucket prior to upload',
                         action='store_true')
+    parser.add_argument('-j',
+                        '--jobs',
+                        help='Maximum number of concurrent uploads. '
+                             'Defaults to 1.',
+                        type=int,
+                        default=1)
+    parser.add_argument('--sync',
+                        help='Skip files that are identical to existing '
+                             'objects',
+                        action='store_true')
+    parser.add_argument('--part-size',
+                        help='Part size in MB for multipart uploads. '
+                             'Defaults to a size based on the file size.',
+                        type=int)
+    parser.add_argument('--part-jobs',
+                        help='Maximum number of concurrent part uploads '
+                             'per file. Defaults to 10.',
+                        type=int)
+    parser.add_argument('--resume',
+                        help='Resume interrupted multipart uploads',
+                        action='store_true')
+    parser.add_argument('--warm-up',
+                        help='Open connections before the upload starts',
+                        action='store_true')
+    parser.add_argument('--include',
+                        help='Only upload files whose name or relative path '
+                             'matches PATTERN. Can be specified multiple '
+                             'times.',
+                        metavar='PATTERN',
+                        action='append')
+    parser.add_argument('--exclude',
+                        help='Skip files and directories whose name or '
+                             'relative path matches PATTERN. Can be '
+                             'specified multiple times.',
+                        metavar='PATTERN',
+                        action='append')
+    parser.add_argument('--ignore-file',
+                        help='File containing exclude patterns, one per line',
+                        metavar='FILE')
+    parser.add_argument('--walk-jobs',
+                        help='Maximum number of local directories that are '
+                             'read concurrently. Defaults to {}.'
+                             .format(WALK_JOBS),
+                        type=int,
+                        default=WALK_JOBS)
 
     # parse command line parameters
     args = parser.parse_args()
@@ -254,17 +550,32 @@ def main():
               ' and AWS_SECRET_ACCESS_KEY must be set.')
         sys.exit(1)
 
+    part_size = None
+    if args.part_size:
+        part_size = args.part_size * 1024 * 1024
+
     try:
         # perform upload
-        upload_count = do_upload(args.bucket,
-                                 args.pattern,
-                                 os.environ['AWS_ACCESS_KEY_ID'],
-                                 os.environ['AWS_SECRET_ACCESS_KEY'],
-                                 args.prefix,
-                                 args.wipe,
-                                 args.squash,
-                                 args.recursive,
-                                 verbose=True)
+        upload_count = call(do_upload,
+                            args.bucket,
+                            args.pattern,
+                            os.environ['AWS_ACCESS_KEY_ID'],
+                            os.environ['AWS_SECRET_ACCESS_KEY'],
+                            args.prefix,
+                            args.wipe,
+                            args.squash,
+                            args.recursive,
+                            verbose=True,
+                            jobs=args.jobs,
+                            sync=args.sync,
+                            part_size=part_size,
+                            part_jobs=args.part_jobs,
+                            resume=args.resume,
+                            warm_up=args.warm_up,
+                            walk_jobs=args.walk_jobs,
+                            include=args.include,
+                            exclude=args.exclude,
+                            ignore_file=args.ignore_file)
 
         print('Uploaded {} file(s) to bucket "{}".'
               .format(upload_count, args.bucket))
@@ -0,0 +1,326 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import queue
+import threading
+
+from .patterns import KeyMatcher
+
+# default number of directories that are scanned concurrently
+WALK_JOBS = 8
+
+# marks the end of the walk
+_DONE = object()
+
+
+class _WalkError:
+    """
+    Hands an exception that was raised in a worker thread over to
+    the consumer of the walk
+    """
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+class PathFilter:
+    """
+    Selects files and directories by their path relative to the root
+    of a walk. Patterns use the object key wildcards (*, **, ? and
+    [...]). A pattern without a / (other than a trailing one) matches
+    the name of a file or directory at any depth, while a pattern that
+    contains a / matches the relative path. A pattern with a trailing
+    / only matches directories.
+    """
+
+    def __init__(self,
+                 include=None,
+                 exclude=None):
+        """
+            :param include: if specified, only files that match at
+            least one of these patterns are selected; defaults to None
+            :type include: list(str), optional
+
+            :param exclude: files and directories that match one of
+            these patterns are not selected; the content of excluded
+            directories is never read; defaults to None
+            :type exclude: list(str), optional
+
+            :raises ValueError: a pattern is invalid
+        """
+
+        self._include = _PatternList(include) if include else None
+        self._exclude = _PatternList(exclude) if exclude else None
+
+    def includes_file(self,
+                      path):
+        """
+            Return True if the file is selected.
+
+            :param path: path relative to the root, using / as separator
+            :type path: str
+
+            :rtype: bool
+        """
+
+        if self._exclude is not None and self._exclude.matches(path, False):
+            return False
+        return self._include is None or self._include.matches(path, False)
+
+    def includes_directory(self,
+                           path):
+        """
+            Return True if the directory needs to be read.
+
+            :param path: path relative to the root, using / as separator
+            :type path: str
+
+            :rtype: bool
+        """
+
+        return self._exclude is None or \
+            not self._exclude.matches(path, True)
+
+    def includes_path(self,
+                      path):
+        """
+            Return True if the file is selected and none of the
+            directories in its path is excluded. Use this method for
+            files that were not found by walk_files.
+
+            :param path: path relative to the root, using / as separator
+            :type path: str
+
+            :rtype: bool
+        """
+
+        directories = path.split('/')[:-1]
+        for index in range(len(directories)):
+            if not self.includes_directory('/'.join(directories[:index + 1])):
+                return False
+        return self.includes_file(path)
+
+
+class _PatternList:
+    """
+    Matches paths against multiple PathFilter patterns
+    """
+
+    def __init__(self, patterns):
+        specs = {}
+        for pattern in patterns:
+            directory_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            anchored = '/' in pattern
+            specs.setdefault((anchored, directory_only), [])\
+                 .append(pattern.lstrip('/'))
+        self._matchers = [(anchored, directory_only, KeyMatcher(patterns))
+                          for (anchored, directory_only), patterns
+                          in specs.items()]
+
+    def matches(self, path, is_directory):
+        name = path.rsplit('/', 1)[-1]
+        for anchored, directory_only, matcher in self._matchers:
+            if directory_only and not is_directory:
+                continue
+            if matcher.matches(path if anchored else name):
+                return True
+        return False
+
+
+def read_ignore_file(file):
+    """
+    Read exclude patterns from file, which contains one pattern per
+    line. Empty lines and lines starting with # are skipped.
+
+    :param file: path of the ignore file
+    :type file: str
+    :raises OSError: the file cannot be read
+    :return: patterns
+    :rtype: list(str)
+    """
+
+    with open(file, encoding='utf-8') as lines:
+        return [line.strip() for line in lines
+                if line.strip() and not line.startswith('#')]
+
+
+def walk_files(top,
+               recursive=False,
+               match=None,
+               descend=None,
+               follow_symlinks=False,
+               jobs=WALK_JOBS,
+               queue_size=1000):
+    """
+    Yield (path, size, mtime) tuples for the files in directory top.
+    Directories are read with os.scandir, which provides the type of
+    each entry without an additional system call; only files that are
+    yielded are stat'ed. If recursive is set, subdirectories are read
+    by up to jobs threads, and files are yielded in no particular order
+    while the walk is in progress. Unreadable directories are skipped.
+
+    :param top: directory; '' identifies the current directory, whose
+    files are yielded without a directory component
+    :type top: str
+    :param recursive: include files in subdirectories, defaults to False
+    :type recursive: bool, optional
+    :param match: called with the path of each file relative to top
+    (using / as separator); the file is skipped unless it returns True,
+    defaults to None (all files)
+    :type match: callable, optional
+    :param descend: called with the path of each subdirectory relative
+    to top; the subdirectory is not read unless it returns True,
+    defaults to None (all subdirectories)
+    :type descend: callable, optional
+    :param follow_symlinks: descend into symbolic links to directories,
+    defaults to False. Files are always followed.
+    :type follow_symlinks: bool, optional
+    :param jobs: maximum number of directories that are read
+    concurrently, defaults to WALK_JOBS
+    :type jobs: int, optional
+    :param queue_size: maximum number of files that are waiting to be
+    consumed, defaults to 1000
+    :type queue_size: int, optional
+    :return: (path, size, mtime) tuples
+    :rtype: generator
+    """
+
+    # (device, inode) of the directories that were read; prevents
+    # cycles if symbolic links are followed
+    visited = set()
+    visited_lock = threading.Lock()
+
+    def scan(directory, relative):
+        """
+        Read directory; return a list of files and a list of
+        subdirectories as (path, relative path) tuples
+        """
+        files = []
+        subdirectories = []
+        try:
+            with os.scandir(directory or os.curdir) as entries:
+                for entry in entries:
+                    path = os.path.join(directory, entry.name)
+                    name = relative + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=follow_symlinks):
+                            if not recursive:
+                                continue
+                            if descend is not None and not descend(name):
+                                continue
+                            if follow_symlinks:
+                                stat = entry.stat()
+                                with visited_lock:
+                                    if (stat.st_dev, stat.st_ino) in visited:
+                                        continue
+                                    visited.add((stat.st_dev, stat.st_ino))
+                            subdirectories.append((path, name + '/'))
+                        elif entry.is_file():
+                            if match is not None and not match(name):
+                                continue
+                            stat = entry.stat()
+                            files.append((path,
+                                          stat.st_size,
+                                          stat.st_mtime))
+                    except OSError:
+                        # the entry was removed or is a broken link
+                        continue
+        except OSError:
+            # skip directories that cannot be read
+            pass
+        return files, subdirectories
+
+    if follow_symlinks:
+        try:
+            stat = os.stat(top or os.curdir)
+            visited.add((stat.st_dev, stat.st_ino))
+        except OSError:
+            pass
+
+    if not recursive or jobs is None or jobs <= 1:
+        # read the directories in the calling thread
+        pending = [(top, '')]
+        while pending:
+            files, subdirectories = scan(*pending.pop())
+            yield from files
+            pending.extend(reversed(subdirectories))
+        return
+
+    directories = queue.Queue()
+    results = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+    lock = threading.Lock()
+    # number of directories whose files were not yet handed over
+    outstanding = 1
+
+    def put(item):
+        # wait for the consumer unless it stopped consuming
+        while not stopped.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def work():
+        nonlocal outstanding
+        while True:
+            directory = directories.get()
+            if directory is _DONE or stopped.is_set():
+                return
+            try:
+                files, subdirectories = scan(*directory)
+            except BaseException as ex:
+                # match or descend failed; the consumer raises the
+                # exception, which stops the walk
+                put(_WalkError(ex))
+                return
+            with lock:
+                outstanding = outstanding + len(subdirectories)
+            for subdirectory in subdirectories:
+                directories.put(subdirectory)
+            for file in files:
+                put(file)
+            # the directory is done once its files were handed over
+            with lock:
+                outstanding = outstanding - 1
+                done = outstanding == 0
+            if done:
+                put(_DONE)
+
+    directories.put((top, ''))
+    workers = [threading.Thread(target=work, daemon=True)
+               for _ in range(jobs)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        while True:
+            file = results.get()
+            if file is _DONE:
+                return
+            if isinstance(file, _WalkError):
+                raise file.exception
+            yield file
+    finally:
+        # also stops the workers if the consumer stopped early
+        stopped.set()
+        for _ in workers:
+            directories.put(_DONE)
+        for worker in workers:
+            worker.join()
@@ -19,13 +19,18 @@ setup(
                     'ibm-cos-sdk',
                     'requests'
   ],
+  extras_require={
+    'inventory': ['numpy']
+  },
   entry_points={
     'console_scripts': [
       'upload_files = cos_utils.upload_files:main',
       'download_files = cos_utils.download_files:main',
       'list_files = cos_utils.list_files:main',
       'remove_files = cos_utils.remove_files:main',
-      'list_buckets = cos_utils.list_buckets:main'
+      'list_buckets = cos_utils.list_buckets:main',
+      'abort_uploads = cos_utils.abort_uploads:main',
+      'cos_utils_daemon = cos_utils.daemon:main'
     ]
   },
   classifiers=[
@@ -0,0 +1,63 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import subprocess
+import sys
+
+# modules that implement the console scripts
+CLI_MODULES = ['cos_utils.abort_uploads',
+               'cos_utils.download_files',
+               'cos_utils.list_buckets',
+               'cos_utils.list_files',
+               'cos_utils.remove_files',
+               'cos_utils.upload_files']
+
+
+def imported_modules(module):
+    # -X importtime reports every imported module on stderr
+    result = subprocess.run([sys.executable,
+                             '-X',
+                             'importtime',
+                             '-c',
+                             'import {}'.format(module)],
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE,
+                            universal_newlines=True,
+                            check=True)
+    return [line.split('|')[-1].strip()
+            for line in result.stderr.splitlines()
+            if line.startswith('import time:')]
+
+
+def test_cli_imports_no_sdk():
+    for module in CLI_MODULES:
+        modules = imported_modules(module)
+        assert module in modules
+        assert 'ibm_boto3' not in modules, module
+        assert 'cos_utils.cos' not in modules, module
+
+
+def test_cli_help():
+    for module in CLI_MODULES:
+        result = subprocess.run([sys.executable,
+                                 '-m',
+                                 module,
+                                 '--help'],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        assert result.returncode == 0, module
+        assert result.stdout.startswith('usage:'), module
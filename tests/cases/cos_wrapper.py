@@ -0,0 +1,396 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import hashlib
+import json
+import threading
+
+import pytest
+
+from ibm_botocore.client import ClientError
+
+from cos_utils.cos import COSWrapper, COSWrapperError, compute_etag
+
+
+def offline_wrapper(client=None):
+    # skip the constructor, which creates a client for the service
+    cw = COSWrapper.__new__(COSWrapper)
+    cw.client = client
+    return cw
+
+
+class DeleteClient:
+
+    def __init__(self, failing_keys=()):
+        self.failing_keys = set(failing_keys)
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [entry['Key'] for entry in Delete['Objects']]
+        with self.lock:
+            self.batches.append(keys)
+        errors = [{'Key': key, 'Code': 'AccessDenied'}
+                  for key in keys if key in self.failing_keys]
+        # like the service, only include Errors if there are any
+        return {'Errors': errors} if errors else {}
+
+
+def test_delete_objects():
+    keys = ['key{:04}'.format(i) for i in range(2500)]
+    for jobs in [1, 4]:
+        client = DeleteClient()
+        cw = offline_wrapper(client)
+        assert cw.delete_objects('bucket', iter(keys), jobs=jobs) == 2500
+        assert sorted(len(batch) for batch in client.batches) == \
+            [500, 1000, 1000]
+        assert sorted(key for batch in client.batches
+                      for key in batch) == keys
+
+
+def test_delete_objects_errors():
+    keys = ['key{:04}'.format(i) for i in range(2500)]
+    # one failure in each batch
+    failing_keys = ['key0010', 'key1010', 'key2010']
+    for jobs in [1, 4]:
+        client = DeleteClient(failing_keys)
+        cw = offline_wrapper(client)
+        with pytest.raises(COSWrapperError,
+                           match=r'^3 object\(s\) could not be deleted') \
+                as excinfo:
+            cw.delete_objects('bucket', keys, jobs=jobs)
+        for key in failing_keys:
+            assert '"{}": AccessDenied'.format(key) in str(excinfo.value)
+        # all batches were sent
+        assert sum(len(batch) for batch in client.batches) == 2500
+
+
+def test_compute_etag(tmp_path):
+    file = tmp_path / 'data'
+    content = bytes(range(10))
+    file.write_bytes(content)
+
+    # single part upload
+    assert compute_etag(str(file), 11, 4) == \
+        hashlib.md5(content).hexdigest()
+
+    # multipart upload; the last part is smaller
+    digests = b''.join(hashlib.md5(content[offset:offset + 4]).digest()
+                       for offset in [0, 4, 8])
+    assert compute_etag(str(file), 10, 4) == \
+        '{}-3'.format(hashlib.md5(digests).hexdigest())
+
+    # parts of equal size
+    digests = b''.join(hashlib.md5(content[offset:offset + 5]).digest()
+                       for offset in [0, 5])
+    assert compute_etag(str(file), 10, 5) == \
+        '{}-2'.format(hashlib.md5(digests).hexdigest())
+
+    with pytest.raises(FileNotFoundError):
+        compute_etag(str(tmp_path / 'missing'), 10, 5)
+
+
+def test_part_size():
+    cw = offline_wrapper()
+    megabyte = 1024*1024
+    gigabyte = 1024*megabyte
+
+    # small files use the minimum part size
+    assert cw.get_part_size(16*megabyte) == cw.MULTIPART_CHUNKSIZE
+    assert cw.get_part_size(16*megabyte, megabyte) == cw.MULTIPART_CHUNKSIZE
+
+    # the part size grows with the file size, in full megabytes
+    assert cw.get_part_size(100*gigabyte) == 103*megabyte
+    assert cw.get_part_size(10*gigabyte, 8*megabyte) == 8*megabyte
+
+    # requested part sizes are increased to stay within the
+    # part count limit
+    for file_size in [100*gigabyte, 100*gigabyte + 1]:
+        part_size = cw.get_part_size(file_size, cw.MULTIPART_CHUNKSIZE)
+        assert -(-file_size // part_size) == cw.MULTIPART_MAX_PARTS
+
+    # but never exceed the maximum part size
+    assert cw.get_part_size(10*1024*gigabyte, 10*gigabyte) == \
+        cw.MULTIPART_MAX_CHUNKSIZE
+    assert cw.MULTIPART_MAX_CHUNKSIZE == 5*gigabyte
+
+
+def test_part_concurrency():
+    cw = offline_wrapper()
+    megabyte = 1024*1024
+
+    assert cw.get_part_concurrency(0, 5*megabyte) == 1
+    assert cw.get_part_concurrency(16*megabyte, 5*megabyte) == 4
+    assert cw.get_part_concurrency(16*megabyte, 5*megabyte, 2) == 2
+    assert cw.get_part_concurrency(1024*megabyte, 5*megabyte) == \
+        cw.MULTIPART_CONCURRENCY
+    assert cw.get_part_concurrency(1024*megabyte, 5*megabyte, 50) == 50
+
+
+class TransferClient:
+
+    def __init__(self):
+        self.configs = []
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, Config):
+        self.configs.append(Config)
+
+    def head_object(self, Bucket, Key):
+        return {'ETag': '"etag-4"'}
+
+
+def test_upload_etag(tmp_path):
+    file = tmp_path / 'data'
+    with open(str(file), 'wb') as data:
+        data.truncate(16*1024*1024)
+
+    client = TransferClient()
+    cw = offline_wrapper(client)
+    # files that the transfer manager uploads return an ETag, too
+    assert cw.upload_object(str(file), 'bucket', 'key') == 'etag-4'
+    # in the part size that compute_etag uses in sync mode
+    assert [config.multipart_chunksize for config in client.configs] == \
+        [cw.get_part_size(16*1024*1024)]
+
+
+class MultipartClient:
+
+    def __init__(self):
+        self.uploads = {}
+        self.aborted = []
+        self.completed = []
+        self.failing_parts = set()
+        self.lock = threading.Lock()
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = 'upload{}'.format(len(self.uploads) + 1)
+        self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        if PartNumber in self.failing_parts:
+            raise IOError('connection reset')
+        etag = '"{}"'.format(hashlib.md5(Body).hexdigest())
+        with self.lock:
+            self.uploads[UploadId][PartNumber] = etag
+        return {'ETag': etag}
+
+    def get_paginator(self, operation):
+        assert operation == 'list_parts'
+        return self
+
+    def paginate(self, Bucket, Key, UploadId):
+        parts = self.uploads[UploadId]
+        yield {'Parts': [{'PartNumber': number, 'ETag': parts[number]}
+                         for number in sorted(parts)]}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId,
+                                  MultipartUpload):
+        self.completed.append((UploadId, MultipartUpload['Parts']))
+        return {'ETag': '"etag-{}"'.format(len(MultipartUpload['Parts']))}
+
+
+def test_upload_resume(tmp_path):
+    file = tmp_path / 'data'
+    file.write_bytes(b'0123456789ab')
+    journal_dir = tmp_path / 'journal'
+
+    client = MultipartClient()
+    cw = offline_wrapper(client)
+
+    def upload():
+        return cw._upload_resumable(str(file), 12, 'bucket', 'key',
+                                    4, 2, str(journal_dir))
+
+    client.failing_parts = {3}
+    with pytest.raises(IOError):
+        upload()
+    assert sorted(client.uploads['upload1']) == [1, 2]
+    assert len(list(journal_dir.iterdir())) == 1
+
+    # the server lost part 2; only parts 2 and 3 are uploaded again
+    client.failing_parts = set()
+    del client.uploads['upload1'][2]
+    uploaded = []
+    upload_part = client.upload_part
+
+    def record_part(**kwargs):
+        uploaded.append(kwargs['PartNumber'])
+        return upload_part(**kwargs)
+
+    client.upload_part = record_part
+    assert upload() == 'etag-3'
+    assert sorted(uploaded) == [2, 3]
+    assert [upload_id for upload_id, _ in client.completed] == ['upload1']
+    assert [part['PartNumber'] for part in client.completed[0][1]] == \
+        [1, 2, 3]
+    # the journal is removed when the upload completes
+    assert list(journal_dir.iterdir()) == []
+
+
+def test_upload_resume_incomplete_journal(tmp_path):
+    file = tmp_path / 'data'
+    file.write_bytes(b'0123456789abcdefghijklmn')
+    journal_dir = tmp_path / 'journal'
+
+    client = MultipartClient()
+    cw = offline_wrapper(client)
+    uploaded = []
+    upload_part = client.upload_part
+
+    def record_part(**kwargs):
+        uploaded.append(kwargs['PartNumber'])
+        return upload_part(**kwargs)
+
+    client.upload_part = record_part
+
+    def upload():
+        return cw._upload_resumable(str(file), 24, 'bucket', 'key',
+                                    4, 1, str(journal_dir))
+
+    client.failing_parts = {5, 6}
+    with pytest.raises(IOError):
+        upload()
+
+    # the upload was interrupted while the record of part 4 was written
+    journal = next(journal_dir.iterdir())
+    content = journal.read_text()
+    journal.write_text(content[:content.rindex('"etag"')])
+
+    client.failing_parts = {6}
+    uploaded.clear()
+    with pytest.raises(IOError):
+        upload()
+    assert uploaded == [4, 5, 6]
+    # the incomplete line was dropped
+    lines = journal.read_text().splitlines()
+    assert [json.loads(line)['part'] for line in lines[1:]] == \
+        [1, 2, 3, 4, 5]
+
+    client.failing_parts = set()
+    uploaded.clear()
+    assert upload() == 'etag-6'
+    assert uploaded == [6]
+    assert list(journal_dir.iterdir()) == []
+
+
+def test_upload_resume_changed_file(tmp_path):
+    file = tmp_path / 'data'
+    file.write_bytes(b'0123456789ab')
+    journal_dir = tmp_path / 'journal'
+
+    client = MultipartClient()
+    cw = offline_wrapper(client)
+
+    client.failing_parts = {3}
+    with pytest.raises(IOError):
+        cw._upload_resumable(str(file), 12, 'bucket', 'key',
+                             4, 2, str(journal_dir))
+
+    # the file has changed; the upload starts over
+    client.failing_parts = set()
+    file.write_bytes(b'0123456789abcdef')
+    assert cw._upload_resumable(str(file), 16, 'bucket', 'key',
+                                4, 2, str(journal_dir)) == 'etag-4'
+    assert client.aborted == ['upload1']
+    assert sorted(client.uploads['upload2']) == [1, 2, 3, 4]
+    assert list(journal_dir.iterdir()) == []
+
+
+class Body:
+
+    def __init__(self, data, fail_after=None):
+        self.data = data
+        self.fail_after = fail_after
+
+    def iter_chunks(self, chunk_size):
+        for offset in range(0, len(self.data), 4):
+            if self.fail_after is not None and offset >= self.fail_after:
+                raise IOError('connection reset')
+            yield self.data[offset:offset + 4]
+
+
+class DownloadClient:
+
+    def __init__(self, data, etag):
+        self.data = data
+        self.etag = etag
+        self.fail_after = None
+        self.requests = []
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        self.requests.append((Range, IfMatch))
+        if IfMatch is not None and IfMatch != self.etag:
+            raise ClientError({'Error': {'Code': 'PreconditionFailed'}},
+                              'GetObject')
+        response = {'ETag': self.etag}
+        data = self.data
+        if Range:
+            offset = int(Range[len('bytes='):].rstrip('-'))
+            data = data[offset:]
+            response['ContentRange'] = 'bytes {}-{}/{}'.format(
+                offset, len(self.data) - 1, len(self.data))
+        response['Body'] = Body(data, self.fail_after)
+        return response
+
+
+def test_download_resume(tmp_path):
+    target = tmp_path / 'data'
+    part = tmp_path / 'data.part'
+    etag_file = tmp_path / 'data.part.etag'
+
+    client = DownloadClient(b'0123456789ab', '"etag1"')
+    cw = offline_wrapper(client)
+
+    def download():
+        cw._download_resumable('bucket', 'key', str(target), lambda _: None)
+
+    client.fail_after = 8
+    with pytest.raises(IOError):
+        download()
+    assert part.read_bytes() == b'01234567'
+    assert etag_file.read_text() == '"etag1"'
+    assert not target.exists()
+
+    # only the remainder of the same object version is fetched
+    client.fail_after = None
+    download()
+    assert client.requests[-1] == ('bytes=8-', '"etag1"')
+    assert target.read_bytes() == b'0123456789ab'
+    assert not part.exists()
+    assert not etag_file.exists()
+
+
+def test_download_resume_changed_object(tmp_path):
+    target = tmp_path / 'data'
+    part = tmp_path / 'data.part'
+    etag_file = tmp_path / 'data.part.etag'
+
+    part.write_bytes(b'01234567')
+    etag_file.write_text('"etag1"')
+
+    # the object has changed; the download starts over
+    client = DownloadClient(b'abcdefghijklmnop', '"etag2"')
+    cw = offline_wrapper(client)
+    cw._download_resumable('bucket', 'key', str(target), lambda _: None)
+    assert client.requests == [('bytes=8-', '"etag1"'), (None, None)]
+    assert target.read_bytes() == b'abcdefghijklmnop'
+    assert not part.exists()
+    assert not etag_file.exists()
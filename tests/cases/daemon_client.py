@@ -0,0 +1,212 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import os
+import pytest
+import threading
+import time
+
+from cos_utils import daemon
+from cos_utils.cos import COSWrapper
+from cos_utils.daemon import DaemonError, call, get_socket_path
+from cos_utils.list_buckets import do_list
+
+
+def add(a, b=0):
+    return a + b
+
+
+def in_main_thread():
+    return threading.current_thread() is threading.main_thread()
+
+
+def paths(target_dir=None, ignore_file=None):
+    return [target_dir, ignore_file]
+
+
+def fail(message):
+    raise RuntimeError(message)
+
+
+# set when the generator of an endless operation is closed
+endless_closed = threading.Event()
+
+
+def endless():
+    try:
+        number = 0
+        while True:
+            yield number
+            number = number + 1
+    finally:
+        endless_closed.set()
+
+
+class TransferClient:
+
+    def download_file(self, bucket_name, object_key, target, Callback):
+        # like the transfer manager, report progress from other threads
+        def transfer():
+            with open(target, 'wb') as data:
+                data.write(b'data')
+            Callback(4)
+
+        worker = threading.Thread(target=transfer)
+        worker.start()
+        worker.join()
+
+
+def download(target):
+    cw = COSWrapper.__new__(COSWrapper)
+    cw.client = TransferClient()
+    return cw.download_object('bucket', 'key', target)
+
+
+def count(n):
+    print('counting to {}'.format(n))
+    for number in range(n):
+        yield number
+    print('done')
+
+
+@pytest.fixture
+def start_daemon(monkeypatch, tmp_path):
+    socket_path = str(tmp_path / 'test.sock')
+    monkeypatch.setenv('COS_UTILS_SOCKET', socket_path)
+    # operations that are defined in this module
+    for function in [add, in_main_thread, fail, count, endless, download]:
+        monkeypatch.setitem(daemon.OPERATIONS,
+                            '{}.{}'.format(__name__, function.__name__),
+                            {})
+    # like download_files.do_download and upload_files.do_upload
+    monkeypatch.setitem(daemon.OPERATIONS,
+                        '{}.paths'.format(__name__),
+                        {'target_dir': '', 'ignore_file': None})
+
+    stop = threading.Event()
+    server = threading.Thread(target=daemon.serve,
+                              args=(socket_path,),
+                              kwargs={'stop': stop})
+
+    def start():
+        # the daemon replaces sys.stdout; tests start it themselves
+        # because pytest restores sys.stdout after the fixture setup
+        server.start()
+        for _ in range(100):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+        return socket_path
+
+    yield start
+    if server.is_alive():
+        stop.set()
+        server.join(timeout=10)
+        assert not server.is_alive()
+
+
+def test_socket_path(monkeypatch, tmp_path):
+    monkeypatch.setenv('COS_UTILS_SOCKET', str(tmp_path / 'test.sock'))
+    assert get_socket_path() == str(tmp_path / 'test.sock')
+
+    monkeypatch.delenv('COS_UTILS_SOCKET')
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    assert get_socket_path() == str(tmp_path / 'cos_utils.sock')
+
+
+def test_call_without_daemon(monkeypatch, tmp_path):
+    # no daemon is listening; the operation is performed in-process
+    monkeypatch.setenv('COS_UTILS_SOCKET', str(tmp_path / 'test.sock'))
+    assert not os.path.exists(get_socket_path())
+
+    with pytest.raises(ValueError):
+        call(do_list, None, None)
+
+
+def test_call_forwarded(start_daemon):
+    start_daemon()
+    # the operation runs in a request thread of the daemon
+    assert call(in_main_thread) is False
+    assert call(add, 1, b=2) == 3
+
+    # the operation fails in the daemon
+    with pytest.raises(DaemonError, match='broken'):
+        call(fail, 'broken')
+    with pytest.raises(DaemonError, match='access_key_id'):
+        call(do_list, None, None)
+
+
+def test_operation_not_supported(start_daemon):
+    socket_path = start_daemon()
+    # call only forwards supported operations; send a request directly
+    sock = daemon._connect(socket_path)
+    sock.sendall(json.dumps({'operation': 'os.getcwd',
+                             'arguments': {},
+                             'cwd': '/'}).encode('utf-8') + b'\n')
+    with pytest.raises(DaemonError, match='not supported'):
+        next(daemon._read_responses(sock))
+
+
+def test_streamed_items_and_output(start_daemon, capsys):
+    start_daemon()
+    assert list(call(count, 3)) == [0, 1, 2]
+    # output of the operation is printed by the client
+    assert capsys.readouterr().out == 'counting to 3\ndone\n'
+
+
+def test_transfer_progress(start_daemon, tmp_path):
+    socket_path = start_daemon()
+    # progress that other threads of the daemon report is sent to
+    # the client; read the responses directly
+    target = str(tmp_path / 'data')
+    sock = daemon._connect(socket_path)
+    sock.sendall(json.dumps({'operation': '{}.download'.format(__name__),
+                             'arguments': {'target': target},
+                             'cwd': '/'}).encode('utf-8') + b'\n')
+    with sock, sock.makefile('r', encoding='utf-8') as responses:
+        assert [json.loads(line) for line in responses] == \
+            [{'output': '.'}, {'output': '\n'}, {'result': target}]
+
+
+def test_client_disconnects(start_daemon):
+    start_daemon()
+    endless_closed.clear()
+    items = call(endless)
+    assert next(items) == 0
+    # stop reading, like a client that was interrupted
+    items.close()
+    assert endless_closed.wait(timeout=10)
+
+
+def test_paths(start_daemon):
+    socket_path = start_daemon()
+
+    def request(arguments):
+        sock = daemon._connect(socket_path)
+        sock.sendall(json.dumps({'operation': '{}.paths'.format(__name__),
+                                 'arguments': arguments,
+                                 'cwd': '/client'}).encode('utf-8') + b'\n')
+        return next(daemon._read_responses(sock))['result']
+
+    # paths are resolved relative to the client's working directory
+    assert request({}) == ['/client/', None]
+    assert request({'target_dir': None, 'ignore_file': None}) == \
+        ['/client/', None]
+    assert request({'target_dir': 'out', 'ignore_file': '.ignore'}) == \
+        ['/client/out', '/client/.ignore']
+    assert request({'target_dir': '/out', 'ignore_file': '/.ignore'}) == \
+        ['/out', '/.ignore']
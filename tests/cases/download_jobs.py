@@ -0,0 +1,56 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import datetime
+
+from cos_utils.download_files import do_download
+
+
+class StubWrapper:
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.downloaded = []
+
+    def verify_connectivity(self, bucket_name):
+        pass
+
+    def iter_object_pages(self, bucket_name, prefix):
+        yield [{'Key': key,
+                'Size': 1,
+                'ETag': 'etag',
+                'LastModified': datetime.datetime.now(datetime.timezone.utc)}
+               for key in self.keys if key.startswith(prefix)]
+
+    def download_object(self, bucket_name, object_key, target, **kwargs):
+        self.downloaded.append((object_key, kwargs['progress']))
+        return target
+
+
+def test_download_jobs(tmp_path):
+    for jobs in [None, 0, 1, 4]:
+        cw = StubWrapper(['a.txt', 'b.txt', 'c.csv'])
+        assert do_download('bucket',
+                           '*.txt',
+                           None,
+                           None,
+                           target_dir=str(tmp_path),
+                           jobs=jobs,
+                           cos_wrapper=cw) == 2
+        # progress is only printed for sequential downloads
+        assert sorted(cw.downloaded) == [('a.txt', jobs != 4),
+                                         ('b.txt', jobs != 4)]
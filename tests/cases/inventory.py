@@ -0,0 +1,163 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import datetime
+import io
+
+import pytest
+
+from cos_utils.inventory import Inventory, InventoryError
+from cos_utils.records import ObjectRecord
+
+np = pytest.importorskip('numpy')
+
+NOW = datetime.datetime(2019, 6, 1, tzinfo=datetime.timezone.utc)
+
+# key, size, age in days, storage class
+OBJECTS = [('a.txt', 10, 1, 'STANDARD'),
+           ('logs/2019/01.log', 100, 60, 'STANDARD'),
+           ('logs/2019/02.log', 200, 40, 'COLD'),
+           ('logs/2019/03.log', 300, 10, 'STANDARD'),
+           ('logs/old.log', 1000, 400, 'COLD'),
+           ('data/münchen/x.csv', 5, 31, 'STANDARD'),
+           ('data/y.csv', 7, 1, None)]
+
+
+def records():
+    for key, size, age, storage_class in OBJECTS:
+        yield ObjectRecord(key,
+                           size,
+                           'etag',
+                           NOW - datetime.timedelta(days=age),
+                           storage_class)
+
+
+def test_columns():
+    inventory = Inventory.from_records(records())
+
+    assert len(inventory) == len(OBJECTS)
+    assert list(inventory.keys()) == [key for key, _, _, _ in OBJECTS]
+    assert inventory.total_size() == 1622
+    assert inventory.storage_classes == ['STANDARD', 'COLD', '']
+    # keys, sizes, mtimes and storage classes of 7 objects
+    assert inventory.nbytes == \
+        len(''.join(key for key, _, _, _ in OBJECTS).encode('utf-8')) + \
+        8 * 8 + 7 * 8 + 7 * 8 + 7
+
+
+def test_masks():
+    inventory = Inventory.from_records(records())
+
+    assert inventory.prefix_mask('logs/2019/').tolist() == \
+        [False, True, True, True, False, False, False]
+    assert not inventory.prefix_mask('logs/2019/01.log.gz').any()
+    assert inventory.prefix_mask('').all()
+
+    old = inventory.modified_before(NOW - datetime.timedelta(days=30))
+    assert old.tolist() == [False, True, True, False, True, True, False]
+    assert inventory.modified_before(NOW.timestamp() - 30 * 86400)\
+        .tolist() == old.tolist()
+
+    assert inventory.storage_class_mask('COLD').tolist() == \
+        [False, False, True, False, True, False, False]
+    assert not inventory.storage_class_mask('ARCHIVE').any()
+
+    assert inventory.total_size(old & inventory.prefix_mask('logs/')) == 1300
+
+
+def test_filter():
+    inventory = Inventory.from_records(records())
+
+    selected = inventory.filter(inventory.prefix_mask('data/') |
+                                inventory.storage_class_mask('COLD'))
+    assert list(selected.keys()) == ['logs/2019/02.log',
+                                     'logs/old.log',
+                                     'data/münchen/x.csv',
+                                     'data/y.csv']
+    assert selected.sizes.tolist() == [200, 1000, 5, 7]
+    assert selected.storage_class_mask('COLD').sum() == 2
+
+    empty = inventory.filter(np.zeros(len(inventory), dtype=bool))
+    assert len(empty) == 0
+    assert empty.group_by_prefix() == {}
+
+
+def test_group_by_prefix(monkeypatch):
+    inventory = Inventory.from_records(records())
+
+    assert inventory.group_by_prefix() == {
+        '': (1, 10),
+        'logs/': (4, 1600),
+        'data/': (2, 12)
+    }
+    assert inventory.group_by_prefix(depth=2) == {
+        '': (1, 10),
+        'logs/2019/': (3, 600),
+        'logs/': (1, 1000),
+        'data/münchen/': (1, 5),
+        'data/': (1, 7)
+    }
+
+    # bytes per prefix older than 30 days, compared in small chunks
+    monkeypatch.setattr('cos_utils.inventory.GROUP_CHUNK_SIZE', 2)
+    old = inventory.modified_before(NOW - datetime.timedelta(days=30))
+    assert inventory.group_by_prefix(mask=old) == {
+        'logs/': (3, 1300),
+        'data/': (1, 5)
+    }
+
+
+def test_save_load():
+    inventory = Inventory.from_records(records())
+
+    for compressed in [False, True]:
+        file = io.BytesIO()
+        inventory.save(file, compressed=compressed)
+        file.seek(0)
+        loaded = Inventory.load(file)
+
+        assert list(loaded.keys()) == list(inventory.keys())
+        assert loaded.sizes.tolist() == inventory.sizes.tolist()
+        assert loaded.mtimes.tolist() == inventory.mtimes.tolist()
+        assert loaded.storage_classes == inventory.storage_classes
+        assert loaded.storage_class_mask('COLD').tolist() == \
+            inventory.storage_class_mask('COLD').tolist()
+
+
+def test_numpy_missing(monkeypatch):
+    monkeypatch.setattr('cos_utils.inventory.np', None)
+
+    with pytest.raises(InventoryError, match='requires numpy'):
+        Inventory.from_records(records())
+
+
+def test_large_totals():
+    # totals above 2**53 bytes are not exact in float64
+    size = 2**53 + 1
+    inventory = Inventory.from_records(
+        ObjectRecord('big/{}'.format(number), size, 'etag', NOW)
+        for number in range(3))
+
+    assert inventory.total_size() == 3 * size
+    assert inventory.group_by_prefix() == {'big/': (3, 3 * size)}
+
+
+def test_storage_class_limit():
+    with pytest.raises(InventoryError, match='storage classes'):
+        Inventory.from_records(
+            ObjectRecord('{}'.format(number), 1, 'etag', NOW,
+                         'CLASS{}'.format(number))
+            for number in range(257))
@@ -0,0 +1,115 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import pytest
+
+from cos_utils.download_files import DownloadError, do_download
+from cos_utils.patterns import KeyMatcher, compile_spec, literal_prefix
+
+
+def test_literal_prefix():
+    assert literal_prefix(None) == ''
+    assert literal_prefix('') == ''
+    assert literal_prefix('*') == ''
+    assert literal_prefix('file1.txt') == 'file1.txt'
+    assert literal_prefix('runs/2026-10-01/*.json') == 'runs/2026-10-01/'
+    assert literal_prefix('data?.csv') == 'data'
+    assert literal_prefix('logs/[0-9]*.log') == 'logs/'
+    assert literal_prefix('a+b(c)/*') == 'a+b(c)/'
+    assert literal_prefix('star\\*/*') == 'star*/'
+
+
+def test_literal_prefix_matches():
+    keys = ['runs/2026-10-01/a.json',
+            'runs/2026-10-01/b.csv',
+            'runs/2026-10-02/a.json',
+            'data1.csv']
+    for spec in ['runs/2026-10-01/*.json', 'data?.csv', '*.json', 'run*']:
+        prog = compile_spec(spec)
+        prefix = literal_prefix(spec)
+        for key in filter(prog.match, keys):
+            assert key.startswith(prefix)
+
+
+def test_wildcards():
+    cases = [('*.csv', ['data.csv'], ['dir/data.csv']),
+             ('**/*.csv', ['data.csv', 'a/data.csv', 'a/b/data.csv'],
+              ['data.csvx']),
+             ('**', ['data.csv', 'a/b/data.csv'], []),
+             ('a/**/b', ['a/b', 'a/x/b', 'a/x/y/b'], ['a/xb', 'ab']),
+             ('data?.csv', ['data1.csv'], ['data.csv', 'data12.csv',
+                                           'data/.csv']),
+             ('file[1-3].txt', ['file1.txt', 'file3.txt'],
+              ['file4.txt', 'file/.txt']),
+             ('file[!1-3].txt', ['file4.txt'], ['file1.txt', 'file/.txt']),
+             ('a+b(c).txt', ['a+b(c).txt'], ['aab(c)xtxt']),
+             ('file1.txt', ['file1.txt'], ['file1xtxt', 'file1.txt.bak'])]
+    for spec, matches, mismatches in cases:
+        prog = compile_spec(spec)
+        for key in matches:
+            assert prog.match(key), (spec, key)
+            assert key.startswith(literal_prefix(spec))
+        for key in mismatches:
+            assert not prog.match(key), (spec, key)
+
+
+def test_key_matcher():
+    specs = ['runs/2026-10-01/*.json',
+             'runs/**',
+             'data?.csv',
+             'runs/2026-10-01/a.json']
+    matcher = KeyMatcher(specs)
+
+    assert matcher.prefixes() == ['data', 'runs/']
+
+    assert matcher.match('runs/2026-10-01/a.json') == \
+        ['runs/2026-10-01/*.json', 'runs/**', 'runs/2026-10-01/a.json']
+    assert matcher.match('runs/2026-10-02/a.json') == ['runs/**']
+    assert matcher.match('data1.csv') == ['data?.csv']
+    assert matcher.match('data12.csv') == []
+    assert matcher.matches('runs/x')
+    assert not matcher.matches('other')
+
+    # the matcher agrees with the individual specifications
+    keys = ['runs/2026-10-01/a.json',
+            'runs/2026-10-01/b.csv',
+            'runs/a',
+            'data1.csv',
+            'data.csv',
+            'run']
+    for key in keys:
+        assert matcher.match(key) == [spec for spec in specs
+                                      if compile_spec(spec).match(key)]
+
+
+def test_invalid_spec():
+    for spec in ['[z-a]', 'logs/[9-0]*.log']:
+        with pytest.raises(ValueError,
+                           match='Invalid object key specification'):
+            compile_spec(spec)
+        with pytest.raises(ValueError,
+                           match='Invalid object key specification'):
+            KeyMatcher(['*.txt', spec])
+
+    # the utilities report invalid specifications as their own errors
+    class Wrapper:
+        def verify_connectivity(self, bucket_name):
+            pass
+
+    with pytest.raises(DownloadError,
+                       match='Invalid object key specification'):
+        do_download('bucket', '[z-a]', None, None, cos_wrapper=Wrapper())
@@ -0,0 +1,95 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import csv
+import datetime
+import io
+import json
+import sys
+
+import pytest
+
+from cos_utils.daemon import _decode, _encode
+from cos_utils.list_files import write_records
+from cos_utils.records import ObjectRecord
+
+LAST_MODIFIED = datetime.datetime(2019, 5, 1, 12, 30,
+                                  tzinfo=datetime.timezone.utc)
+
+
+def listing_entry(key, size):
+    # entry of the 'Contents' list of a ListObjectsV2 response
+    return {'Key': key,
+            'Size': size,
+            'ETag': '"0cc175b9c0f1b6a831c399e269772661"',
+            'LastModified': LAST_MODIFIED,
+            'StorageClass': 'STANDARD'}
+
+
+def test_record():
+    record = ObjectRecord.from_listing(listing_entry('dir/a.txt', 1))
+
+    assert record.key == 'dir/a.txt'
+    assert record.size == 1
+    # quotes are removed from the ETag
+    assert record.etag == '0cc175b9c0f1b6a831c399e269772661'
+    assert record.last_modified == LAST_MODIFIED
+    assert record.storage_class == 'STANDARD'
+
+    # records don't have a __dict__
+    assert not hasattr(record, '__dict__')
+    with pytest.raises(AttributeError):
+        record.owner = 'someone'
+
+    assert record.to_dict() == {
+        'key': 'dir/a.txt',
+        'size': 1,
+        'etag': '0cc175b9c0f1b6a831c399e269772661',
+        'last_modified': '2019-05-01T12:30:00+00:00',
+        'storage_class': 'STANDARD'
+    }
+
+
+def test_daemon_encoding():
+    record = ObjectRecord.from_listing(listing_entry('a.txt', 1))
+    data = json.dumps({'item': record}, default=_encode)
+    assert json.loads(data, object_hook=_decode)['item'] == record
+
+
+def test_write_jsonl():
+    records = [ObjectRecord.from_listing(listing_entry(key, size))
+               for key, size in [('a.txt', 1), ('b/c.txt', 2)]]
+    stream = io.StringIO()
+
+    assert write_records(iter(records), stream, 'jsonl') == 2
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == \
+        [record.to_dict() for record in records]
+
+
+def test_write_csv():
+    records = [ObjectRecord.from_listing(listing_entry(key, size))
+               for key, size in [('a,b.txt', 1), ('c.txt', 2)]]
+    stream = io.StringIO()
+
+    assert write_records(records, stream, 'csv') == 2
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert [row['key'] for row in rows] == ['a,b.txt', 'c.txt']
+    assert [int(row['size']) for row in rows] == [1, 2]
+    assert rows[0]['last_modified'] == '2019-05-01T12:30:00+00:00'
+
+    with pytest.raises(ValueError):
+        write_records(records, sys.stdout, 'text')
@@ -0,0 +1,93 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+
+from pathlib import Path
+
+from cos_utils.list_files import do_list
+from cos_utils.upload_files import do_upload
+from cos_utils.remove_files import do_remove
+
+
+def test_env_settings():
+    assert os.environ.get('aws_access_key_id') is not None
+    assert os.environ.get('aws_secret_access_key') is not None
+    assert os.environ.get('x_region_bucket_name') is not None
+
+
+def require_empty_bucket():
+    objects = do_list(os.environ['x_region_bucket_name'],
+                      os.environ['aws_access_key_id'],
+                      os.environ['aws_secret_access_key'])
+    assert isinstance(objects, list)
+    assert len(objects) == 0
+
+
+def test_remove_pattern():
+
+    require_empty_bucket()
+
+    source_path = Path(os.path.dirname(__file__)) / 'assets'
+
+    sources = [source for source in source_path.glob('**/*')
+               if source.is_file()]
+
+    count = do_upload(os.environ['x_region_bucket_name'],
+                      str(source_path),
+                      os.environ['aws_access_key_id'],
+                      os.environ['aws_secret_access_key'],
+                      recursive=True)
+
+    assert count == len(sources)
+
+    # identify objects to be removed without removing them
+    count = do_remove(os.environ['x_region_bucket_name'],
+                      os.environ['aws_access_key_id'],
+                      os.environ['aws_secret_access_key'],
+                      object_spec='data?.csv',
+                      dry_run=True)
+
+    assert count == len(list(source_path.glob('data?.csv')))
+
+    objects = do_list(os.environ['x_region_bucket_name'],
+                      os.environ['aws_access_key_id'],
+                      os.environ['aws_secret_access_key'])
+    assert len(objects) == len(sources)
+
+    # remove the matching objects
+    count = do_remove(os.environ['x_region_bucket_name'],
+                      os.environ['aws_access_key_id'],
+                      os.environ['aws_secret_access_key'],
+                      object_spec='data?.csv')
+
+    assert count == len(list(source_path.glob('data?.csv')))
+
+    objects = do_list(os.environ['x_region_bucket_name'],
+                      os.environ['aws_access_key_id'],
+                      os.environ['aws_secret_access_key'])
+    assert len(objects) == len(sources) - count
+    for object in objects:
+        assert not object.startswith('data')
+
+    # remove the remaining objects
+    count = do_remove(os.environ['x_region_bucket_name'],
+                      os.environ['aws_access_key_id'],
+                      os.environ['aws_secret_access_key'])
+    assert count == len(objects)
+
+    require_empty_bucket()
@@ -0,0 +1,97 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import contextvars
+import threading
+import time
+
+from cos_utils.parallel import run_tasks
+
+
+def test_run_tasks():
+    for jobs in [None, 1, 4]:
+        processed = []
+        lock = threading.Lock()
+
+        def task(item):
+            with lock:
+                processed.append(item)
+            return item % 2
+
+        count, failures = run_tasks(task, range(100), jobs)
+        assert count == 50
+        assert failures == []
+        assert sorted(processed) == list(range(100))
+
+
+def test_run_tasks_failures():
+    for jobs in [1, 4]:
+
+        def task(item):
+            if item in (3, 7):
+                raise ValueError(item)
+            return True
+
+        count, failures = run_tasks(task, range(10), jobs)
+        # failed items don't stop the processing of other items
+        assert count == 8
+        assert sorted(item for item, _ in failures) == [3, 7]
+        for item, ex in failures:
+            assert isinstance(ex, ValueError)
+            assert ex.args == (item,)
+
+
+def test_run_tasks_bounded_queue():
+    jobs = 2
+    queue_size = 3
+    produced = 0
+    release = threading.Event()
+
+    def items():
+        nonlocal produced
+        for item in range(100):
+            produced = produced + 1
+            yield item
+
+    def task(item):
+        release.wait()
+        return True
+
+    result = []
+    runner = threading.Thread(
+        target=lambda: result.append(run_tasks(task,
+                                               items(),
+                                               jobs,
+                                               queue_size=queue_size)))
+    runner.start()
+    time.sleep(0.2)
+    # busy workers, full queue and the item that is waiting
+    # to be queued
+    assert produced == jobs + queue_size + 1
+    release.set()
+    runner.join()
+    assert result == [(100, [])]
+
+
+def test_run_tasks_context():
+    var = contextvars.ContextVar('var', default=None)
+    var.set('caller')
+
+    def task(item):
+        return var.get() == 'caller'
+
+    assert run_tasks(task, range(10), 4) == (10, [])
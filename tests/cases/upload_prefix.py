@@ -63,7 +63,7 @@ def test_prefix():
     objects = do_list(os.environ['x_region_bucket_name'],
                       os.environ['aws_access_key_id'],
                       os.environ['aws_secret_access_key'],
-                      pattern='{}*'.format(prefix))
+                      pattern='{}/*'.format(prefix))
     assert isinstance(objects, list)
     assert len(objects) == len(sources_1)
 
@@ -90,7 +90,7 @@ def test_prefix():
     objects = do_list(os.environ['x_region_bucket_name'],
                       os.environ['aws_access_key_id'],
                       os.environ['aws_secret_access_key'],
-                      pattern='{}*'.format(prefix))
+                      pattern='{}/*'.format(prefix))
     assert isinstance(objects, list)
     assert len(objects) == len(sources_2)
 
@@ -0,0 +1,153 @@
+#
+# Copyright 2018-2019 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+
+from pathlib import Path
+
+import pytest
+
+from cos_utils.walker import PathFilter, read_ignore_file, walk_files
+
+
+def create_tree(root):
+    for name in ['a.txt', 'b.csv', '.hidden.txt',
+                 'd1/c.txt', 'd1/d2/d.txt', '.git/e.txt']:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+    # link back to the root directory
+    os.symlink(str(root), str(root / 'd1' / 'loop'))
+
+
+def relative_paths(root, files):
+    return sorted(str(Path(path).relative_to(root)) for path, _, _ in files)
+
+
+def test_walk(tmp_path):
+    create_tree(tmp_path)
+
+    assert relative_paths(tmp_path, walk_files(str(tmp_path))) == \
+        ['.hidden.txt', 'a.txt', 'b.csv']
+
+    expected = ['.git/e.txt', '.hidden.txt', 'a.txt', 'b.csv',
+                'd1/c.txt', 'd1/d2/d.txt']
+    for jobs in [1, 4]:
+        files = list(walk_files(str(tmp_path), recursive=True, jobs=jobs))
+        assert relative_paths(tmp_path, files) == expected
+        for path, size, mtime in files:
+            assert size == os.path.getsize(path)
+            assert mtime == os.path.getmtime(path)
+
+
+def test_walk_filters(tmp_path):
+    create_tree(tmp_path)
+
+    for jobs in [1, 4]:
+        files = walk_files(str(tmp_path),
+                           recursive=True,
+                           match=lambda name: name.endswith('.txt'),
+                           descend=lambda name: name != '.git',
+                           jobs=jobs)
+        assert relative_paths(tmp_path, files) == \
+            ['.hidden.txt', 'a.txt', 'd1/c.txt', 'd1/d2/d.txt']
+
+
+def test_walk_symlinks(tmp_path):
+    create_tree(tmp_path)
+
+    # the link to the root directory is not followed twice
+    for jobs in [1, 4]:
+        files = walk_files(str(tmp_path),
+                           recursive=True,
+                           follow_symlinks=True,
+                           jobs=jobs)
+        assert len(relative_paths(tmp_path, files)) == 6
+
+
+def test_walk_stop(tmp_path):
+    create_tree(tmp_path)
+
+    files = walk_files(str(tmp_path), recursive=True, jobs=4)
+    next(files)
+    # stops the workers
+    files.close()
+
+
+def test_walk_errors(tmp_path):
+    create_tree(tmp_path)
+
+    def match(name):
+        if name == 'd1/d2/d.txt':
+            raise ValueError(name)
+        return True
+
+    # errors raised in worker threads are raised by the consumer
+    for jobs in [1, 4]:
+        with pytest.raises(ValueError, match='d1/d2/d.txt'):
+            list(walk_files(str(tmp_path),
+                            recursive=True,
+                            match=match,
+                            jobs=jobs))
+
+
+def test_path_filter(tmp_path):
+    create_tree(tmp_path)
+
+    visited = []
+
+    def descend(name):
+        visited.append(name)
+        return path_filter.includes_directory(name)
+
+    # name patterns apply at any depth, excluded directories are not read
+    path_filter = PathFilter(exclude=['.git', 'd2/', '*.csv'])
+    for jobs in [1, 4]:
+        visited.clear()
+        files = walk_files(str(tmp_path),
+                           recursive=True,
+                           match=path_filter.includes_file,
+                           descend=descend,
+                           jobs=jobs)
+        assert relative_paths(tmp_path, files) == \
+            ['.hidden.txt', 'a.txt', 'd1/c.txt']
+        assert sorted(visited) == ['.git', 'd1', 'd1/d2']
+
+    # patterns that contain a / apply to the relative path
+    path_filter = PathFilter(include=['d1/*.txt', 'a.txt'])
+    assert path_filter.includes_file('d1/c.txt')
+    assert path_filter.includes_file('a.txt')
+    assert not path_filter.includes_file('d1/d2/d.txt')
+    assert not path_filter.includes_file('b.csv')
+
+    # patterns with a trailing / only match directories
+    path_filter = PathFilter(exclude=['build/'])
+    assert not path_filter.includes_directory('src/build')
+    assert path_filter.includes_file('src/build')
+    assert not path_filter.includes_path('src/build/a.o')
+
+    path_filter = PathFilter(include=['**/*.txt'], exclude=['/d1/d2'])
+    assert path_filter.includes_path('d1/c.txt')
+    assert path_filter.includes_path('d2/d.txt')
+    assert not path_filter.includes_path('d1/d2/d.txt')
+
+
+def test_read_ignore_file(tmp_path):
+    ignore_file = tmp_path / '.cosignore'
+    ignore_file.write_text('# comment\n\n.git\nnode_modules/\n  *.pyc \n')
+
+    assert read_ignore_file(str(ignore_file)) == \
+        ['.git', 'node_modules/', '*.pyc']